@@ -29,3 +29,9 @@ def setup_file_logging(log_dir: str = "logs", level: int = logging.INFO) -> str:
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("playwright").setLevel(logging.WARNING)
     return logfile
+
+
+def run_summary_path(log_path: str) -> str:
+    """Path of a run's JSON summary, next to its daily log (logs/YYYY-MM-DD_run-HHMMSS.json)."""
+    base, _ext = os.path.splitext(log_path)
+    return f"{base}_run-{datetime.now().strftime('%H%M%S')}.json"
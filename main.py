@@ -4,14 +4,19 @@ import asyncio
 import csv
 import logging
 import os
+import time
 from contextlib import suppress
 from typing import Any, Iterable
 
 from oauth2client.service_account import ServiceAccountCredentials
+from recreacion_linux import metrics
 from recreacion_linux.config import settings
 from recreacion_linux.services.sheets_client import SheetsClient
 from recreacion_linux.web.inter_scraper_async import AsyncInterScraper
-from recreacion_linux.logging_setup import setup_file_logging
+from recreacion_linux.web.sharded_scraper import ShardedInterScraper
+from recreacion_linux.web.status_result import StatusResult
+from recreacion_linux.web.browser_server import DEFAULT_PORT, BrowserServer
+from recreacion_linux.logging_setup import run_summary_path, setup_file_logging
 from recreacion_linux.services.tracker_service import TrackerService
 from recreacion_linux.comparer import compare_statuses
 from recreacion_linux.report import generate_daily_report
@@ -183,12 +188,27 @@ async def update_statuses_linux(
     timeout_ms: int = 25000,
     batch_size: int = 1500,
     sleep_between_batches: float = 15.0,
+    engine: str = "browser",
+    flush_every: int = 50,
+    burst: int = 1,
+    adaptive: bool = False,
+    min_concurrency: int = 1,
+    workers: int = 1,
+    session_guides: int = 0,
+    pipeline: bool = False,
+    hedge: bool = False,
+    summary_path: str | None = None,
 ) -> None:
     """Linux-optimized updater using AsyncInterScraper with low memory footprint.
 
     - Uses small concurrency and throttling to fit in ~4GB RAM environments.
     - Blocks heavy resources (images, media, fonts, CSS) to speed up page load.
     - Writes only non-empty statuses to avoid overwriting existing data.
+    - Flushes sheet writes every ``flush_every`` resolved rows while streaming.
+    - With ``workers > 1`` scraping is sharded across processes (``max_concurrency``
+      and ``rps`` budget split per process / in total respectively).
+    - Writes per-stage timing histograms to ``summary_path`` (JSON) when the run ends.
+    - Updates the process metrics (``recreacion_linux.metrics``) per result and per batch.
     """
     # Read sheet
     records = sheets.read_main_records_resilient()
@@ -245,7 +265,7 @@ async def update_statuses_linux(
         headless_flag = headless_env in {"1", "true", "yes"}
     logging.info("Effective HEADLESS=%s", headless_flag)
 
-    scraper = AsyncInterScraper(
+    scraper_kwargs: dict[str, Any] = dict(
         headless=headless_flag,
         max_concurrency=max_concurrency,
         slow_mo=int(os.getenv("SLOW_MO", str(getattr(settings, "SLOW_MO", 100)))) ,
@@ -256,73 +276,126 @@ async def update_statuses_linux(
         proxy_server=os.getenv("PROXY_SERVER", getattr(settings, "PROXY_SERVER", None) or None),
         proxy_username=os.getenv("PROXY_USERNAME", getattr(settings, "PROXY_USERNAME", None) or None),
         proxy_password=os.getenv("PROXY_PASSWORD", getattr(settings, "PROXY_PASSWORD", None) or None),
+        engine=engine,
+        api_url=os.getenv("INTER_API_URL") or None,
+        burst=burst,
+        adaptive=adaptive,
+        min_concurrency=min_concurrency,
+        session_guides=session_guides,
+        pipeline=pipeline,
+        hedge=hedge,
+        # Memory watchdog (config.Settings; 0 disables each threshold)
+        rss_limit_mb=int(getattr(settings, "BROWSER_RSS_LIMIT_MB", 0) or 0),
+        max_pages_per_browser=int(getattr(settings, "BROWSER_MAX_PAGES", 0) or 0),
+        watchdog_interval_s=float(getattr(settings, "WATCHDOG_INTERVAL_S", 15.0) or 15.0),
+        run_summary_path=summary_path,
     )
+    if workers > 1:
+        # One AsyncInterScraper per process; this process stays the single sheet writer
+        scraper: Any = ShardedInterScraper(workers, scraper_kwargs)
+    else:
+        scraper = AsyncInterScraper(rps=rps, **scraper_kwargs)
+
+    def _row_updates(row_idx: int, raw: str) -> list[Any]:
+        # Normalize using TrackerService mapping
+        norm = TrackerService.normalize_status(raw)
+
+        # Build row updates up to the furthest column we'll touch
+        max_col = web_col
+        if raw_col:
+            max_col = max(max_col, raw_col)
+        if alerta_col:
+            max_col = max(max_col, alerta_col)
+        row_updates: list[Any] = [None] * max_col
+
+        # Write normalized tracking status
+        row_updates[web_col - 1] = norm
+
+        # Optionally write raw into STATUS TRACKING RAW if present
+        if raw_col:
+            row_updates[raw_col - 1] = raw
+
+        # Optionally recompute Alerta if both DROPi and normalized tracking are available
+        if alerta_col:
+            try:
+                # records is aligned with row indices starting at 2
+                rec = records[row_idx - 2]
+                dropi_raw = str(rec.get("STATUS DROPI", "")).strip()
+                dropi_norm = TrackerService.normalize_status(dropi_raw) if dropi_raw else ""
+                alerta = TrackerService.compute_alert(dropi_norm or "", norm or "")
+                row_updates[alerta_col - 1] = alerta
+            except Exception:
+                # Be permissive: if anything fails, skip alerta update for this row
+                pass
+        return row_updates
+
     await scraper.start()
     try:
         for batch_idx, batch in enumerate(chunk(items, max(1, int(batch_size))), start=1):
+            batch_started = time.monotonic()
             first_row = batch[0][0]
             last_row = batch[-1][0]
             logging.info("[Batch %d] rows %s-%s, items=%d", batch_idx, first_row, last_row, len(batch))
 
-            tn_list = [tn for _, tn in batch]
-            results = await scraper.get_status_many(tn_list, rps=rps)
-            status_by_tn = {tn: raw for tn, raw in results}
-
-            # Quick second pass for blanks in this batch (keep same constraints)
-            missing = [tn for tn in tn_list if not (status_by_tn.get(tn) or "").strip()]
-            if missing:
-                logging.info("[Batch %d] second pass for %d missing", batch_idx, len(missing))
-                results2 = await scraper.get_status_many(missing, rps=(rps or 0.6))
-                for tn, raw in results2:
-                    if raw:
-                        status_by_tn[tn] = raw
-
-            # Build batched updates
-            batch_updates: list[tuple[int, list[Any]]] = []
-            for (row_idx, tn) in batch:
-                raw = (status_by_tn.get(tn) or "").strip()
-                if not raw:
-                    continue
+            rows_by_tn: dict[str, list[int]] = {}
+            for row_idx, tn in batch:
+                rows_by_tn.setdefault(tn, []).append(row_idx)
+            tn_list = list(rows_by_tn)
+
+            # Stream results and flush sheet writes incrementally so a crash mid-batch
+            # only loses the unflushed tail
+            resolved: set[str] = set()
+            # Failures another pass cannot fix (unknown guide, exhausted budget)
+            skipped: set[str] = set()
+            failures: dict[str, int] = {}
+            pending_updates: list[tuple[int, list[Any]]] = []
+
+            async def _consume(tracking_numbers: list[str], pass_rps: float | None) -> None:
+                async for result in scraper.iter_status_results(tracking_numbers, rps=pass_rps):
+                    metrics.observe_result(result)
+                    tn = result.tracking_number
+                    raw = (result.status or "").strip()
+                    if not raw:
+                        failures[result.error_class or "empty"] = failures.get(result.error_class or "empty", 0) + 1
+                        if not result.retryable:
+                            skipped.add(tn)
+                        continue
+                    resolved.add(tn)
+                    for row_idx in rows_by_tn[tn]:
+                        pending_updates.append((row_idx, _row_updates(row_idx, raw)))
+                    if len(pending_updates) >= max(1, int(flush_every)):
+                        # Sheets I/O (and its 429 backoff sleeps) stays off the event loop
+                        await asyncio.to_thread(_flush_batch, sheets, list(pending_updates))
+                        pending_updates.clear()
 
-                # Normalize using TrackerService mapping
-                norm = TrackerService.normalize_status(raw)
-
-                # Build row updates up to the furthest column we'll touch
-                max_col = web_col
-                if raw_col:
-                    max_col = max(max_col, raw_col)
-                if alerta_col:
-                    max_col = max(max_col, alerta_col)
-                row_updates = [None] * max_col
-
-                # Write normalized tracking status
-                row_updates[web_col - 1] = norm
-
-                # Optionally write raw into STATUS TRACKING RAW if present
-                if raw_col:
-                    row_updates[raw_col - 1] = raw
-
-                # Optionally recompute Alerta if both DROPi and normalized tracking are available
-                if alerta_col:
-                    # Read DROPi from current records array (we have it as rec) using index from headers
-                    try:
-                        # records is aligned with row indices starting at 2
-                        rec = records[row_idx - 2]
-                        dropi_raw = str(rec.get("STATUS DROPI", "")).strip()
-                        dropi_norm = TrackerService.normalize_status(dropi_raw) if dropi_raw else ""
-                        alerta = TrackerService.compute_alert(dropi_norm or "", norm or "")
-                        row_updates[alerta_col - 1] = alerta
-                    except Exception:
-                        # Be permissive: if anything fails, skip alerta update for this row
-                        pass
-
-                batch_updates.append((row_idx, row_updates))
-
-            if batch_updates:
-                _flush_batch(sheets, batch_updates)
+            try:
+                await _consume(tn_list, rps)
+
+                # Quick second pass for blanks in this batch (keep same constraints); unknown
+                # guides and guides that spent their retry budget are left for the next run
+                missing = [tn for tn in tn_list if tn not in resolved]
+                retryable = [tn for tn in missing if tn not in skipped]
+                if failures:
+                    logging.info("[Batch %d] failures by class: %s", batch_idx, dict(sorted(failures.items())))
+                if retryable:
+                    logging.info("[Batch %d] second pass for %d missing (%d skipped)",
+                                 batch_idx, len(retryable), len(missing) - len(retryable))
+                    metrics.SECOND_PASS.inc(len(retryable))
+                    await _consume(retryable, rps or 0.6)
+                scraper.reset_budgets()
+            finally:
+                # Write what was already resolved even if a pass failed (crash, sheet error)
+                if pending_updates:
+                    await asyncio.to_thread(_flush_batch, sheets, list(pending_updates))
+                    pending_updates.clear()
 
             processed_total += len(batch)
             logging.info("[Batch %d] done. processed_total=%d", batch_idx, processed_total)
+            metrics.BATCH_SECONDS.observe(time.monotonic() - batch_started)
+            metrics.ATTEMPTS.set_total(scraper.attempts_total)
+            metrics.RETRIES.set_total(scraper.retries_total)
+            if scraper.rss_bytes:
+                metrics.BROWSER_RSS.set(scraper.rss_bytes)
 
             if sleep_between_batches and processed_total < len(items):
                 with suppress(Exception):
@@ -331,6 +404,26 @@ async def update_statuses_linux(
         await scraper.close()
 
 
+async def lookup_statuses(tracking_numbers: list[str], timeout_ms: int = 25000, retries: int = 1) -> list[StatusResult]:
+    """Ad-hoc lookup of a few guides (no sheet access). Attaches to BROWSER_ENDPOINT when set."""
+    scraper = AsyncInterScraper(
+        headless=os.getenv("HEADLESS", "true").strip().lower() in {"1", "true", "yes"},
+        max_concurrency=min(2, max(1, len(tracking_numbers))),
+        retries=retries,
+        timeout_ms=timeout_ms,
+        engine=os.getenv("SCRAPER_ENGINE", "browser"),
+        api_url=os.getenv("INTER_API_URL") or None,
+    )
+    await scraper.start()
+    try:
+        results = await scraper.get_status_results(tracking_numbers)
+        for r in results:
+            metrics.observe_result(r)
+        return results
+    finally:
+        await scraper.close()
+
+
 def str2bool(v: str) -> bool:
     return str(v).lower() in {"1", "true", "yes", "y"}
 
@@ -348,9 +441,21 @@ def _build_parser() -> argparse.ArgumentParser:
     p_scrape.add_argument("--end-row", type=int, default=None)
     p_scrape.add_argument("--only-empty", type=str2bool, default=True)
     p_scrape.add_argument("--max-concurrency", type=int, default=2)
+    p_scrape.add_argument("--adaptive", type=str2bool, default=False,
+                        help="AIMD concurrency between --min-concurrency and --max-concurrency")
+    p_scrape.add_argument("--min-concurrency", type=int, default=1)
+    p_scrape.add_argument("--workers", type=int, default=1, help="Scraper processes (each with its own Chromium)")
+    p_scrape.add_argument("--session-guides", type=int, default=0,
+                        help="Reuse a page on the tracking view for up to N guides (0 = full navigation per guide)")
+    p_scrape.add_argument("--pipeline", type=str2bool, default=False,
+                        help="Pre-navigate a standby page per worker while extracting")
+    p_scrape.add_argument("--hedge", type=str2bool, default=False,
+                        help="Start a second attempt for guides slower than the running p90 latency")
     p_scrape.add_argument("--rps", type=float, default=0.8)
+    p_scrape.add_argument("--burst", type=int, default=1, help="Token-bucket burst size for --rps")
     p_scrape.add_argument("--retries", type=int, default=1)
     p_scrape.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=25000)
+    p_scrape.add_argument("--engine", choices=["browser", "http"], default=os.getenv("SCRAPER_ENGINE", "browser"))
     p_scrape.add_argument("--batch-size", type=int, default=1500)
     p_scrape.add_argument("--sleep-between-batches", type=float, default=15.0)
 
@@ -361,12 +466,28 @@ def _build_parser() -> argparse.ArgumentParser:
     p_scrape_csv.add_argument("--start-row", type=int, default=2)
     p_scrape_csv.add_argument("--max-concurrency", type=int, default=1)
     p_scrape_csv.add_argument("--rps", type=float, default=0.6)
+    p_scrape_csv.add_argument("--burst", type=int, default=1, help="Token-bucket burst size for --rps")
     p_scrape_csv.add_argument("--retries", type=int, default=2)
     # Increase timeout for slower iframe mounting (anti-bot, network)
     p_scrape_csv.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=120000)
+    p_scrape_csv.add_argument("--engine", choices=["browser", "http"], default=os.getenv("SCRAPER_ENGINE", "browser"))
     # Soft anti-bot pacing even in headless mode
     p_scrape_csv.add_argument("--slow-mo", dest="slow_mo", type=int, default=100)
 
+    # lookup (ad-hoc, prints tab-separated results)
+    p_lookup = sub.add_parser("lookup", help="Look up the status of the given tracking numbers (no sheet access)")
+    p_lookup.add_argument("tracking_numbers", nargs="+")
+    p_lookup.add_argument("--retries", type=int, default=1)
+    p_lookup.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=25000)
+
+    # browser-server (resident Chromium for BROWSER_ENDPOINT)
+    p_server = sub.add_parser("browser-server", help="Run a resident Chromium that scrape runs attach to over CDP")
+    p_server.add_argument("--port", type=int, default=int(os.getenv("BROWSER_SERVER_PORT", str(DEFAULT_PORT))))
+    p_server.add_argument("--idle-timeout-s", dest="idle_timeout_s", type=float,
+                          default=float(os.getenv("BROWSER_SERVER_IDLE_S", "2700")),
+                          help="Stop Chromium after this long without attached clients")
+    p_server.add_argument("--user-data-dir", dest="user_data_dir", type=str, default=None)
+
     # compare
     p_compare = sub.add_parser("compare", help="Compare DROPi vs WEB statuses and print count; results used by report")
     p_compare.add_argument("--start-row", type=int, default=2)
@@ -391,9 +512,21 @@ def _build_parser() -> argparse.ArgumentParser:
     p_all.add_argument("--end-row", type=int, default=None)
     p_all.add_argument("--only-empty", type=str2bool, default=True)
     p_all.add_argument("--max-concurrency", type=int, default=2)
+    p_all.add_argument("--adaptive", type=str2bool, default=False,
+                        help="AIMD concurrency between --min-concurrency and --max-concurrency")
+    p_all.add_argument("--min-concurrency", type=int, default=1)
+    p_all.add_argument("--workers", type=int, default=1, help="Scraper processes (each with its own Chromium)")
+    p_all.add_argument("--session-guides", type=int, default=0,
+                        help="Reuse a page on the tracking view for up to N guides (0 = full navigation per guide)")
+    p_all.add_argument("--pipeline", type=str2bool, default=False,
+                        help="Pre-navigate a standby page per worker while extracting")
+    p_all.add_argument("--hedge", type=str2bool, default=False,
+                        help="Start a second attempt for guides slower than the running p90 latency")
     p_all.add_argument("--rps", type=float, default=0.8)
+    p_all.add_argument("--burst", type=int, default=1, help="Token-bucket burst size for --rps")
     p_all.add_argument("--retries", type=int, default=1)
     p_all.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=25000)
+    p_all.add_argument("--engine", choices=["browser", "http"], default=os.getenv("SCRAPER_ENGINE", "browser"))
     p_all.add_argument("--batch-size", type=int, default=1500)
     p_all.add_argument("--sleep-between-batches", type=float, default=15.0)
     p_all.add_argument("--only-mismatches", type=str2bool, default=True)
@@ -409,7 +542,32 @@ def main() -> int:
     log_path = setup_file_logging()
     logging.info("Linux runner started. Log file: %s", log_path)
 
+    if args.command == "browser-server":
+        # Long-lived helper: no per-run metrics
+        return _run_command(parser, args, log_path)
+    metrics.start_from_env()
+    code = _run_command(parser, args, log_path)
+    metrics.finish_run(args.command or "none", code == 0)
+    return code
+
+
+def _run_command(parser: argparse.ArgumentParser, args: argparse.Namespace, log_path: str) -> int:
     try:
+        if args.command == "browser-server":
+            server = BrowserServer(
+                port=args.port,
+                headless=os.getenv("HEADLESS", "true").strip().lower() in {"1", "true", "yes"},
+                user_data_dir=args.user_data_dir,
+                idle_timeout_s=args.idle_timeout_s,
+            )
+            return asyncio.run(server.serve())
+
+        if args.command == "lookup":
+            results = asyncio.run(lookup_statuses(list(args.tracking_numbers), args.timeout_ms, args.retries))
+            for r in results:
+                print(f"{r.tracking_number}\t{r.status}\t{r.error_class}")
+            return 0 if all(r.status for r in results) else 1
+
         creds = load_credentials()
         sheets = SheetsClient(creds, settings.spreadsheet_name)
 
@@ -426,6 +584,15 @@ def main() -> int:
                 timeout_ms=args.timeout_ms,
                 batch_size=args.batch_size,
                 sleep_between_batches=args.sleep_between_batches,
+                engine=args.engine,
+                burst=args.burst,
+                adaptive=args.adaptive,
+                min_concurrency=args.min_concurrency,
+                workers=args.workers,
+                session_guides=args.session_guides,
+                pipeline=args.pipeline,
+                hedge=args.hedge,
+                summary_path=run_summary_path(log_path),
             ))
             logging.info("Scrape finished successfully")
             return 0
@@ -462,7 +629,7 @@ def main() -> int:
                 os.makedirs(os.path.dirname(args.out_csv) or ".", exist_ok=True)
                 with open(args.out_csv, "w", newline="", encoding="utf-8") as f:
                     writer = csv.writer(f)
-                    writer.writerow(["row", "tracking", "status_raw", "status_normalized"])
+                    writer.writerow(["row", "tracking", "status_raw", "status_normalized", "error_class"])
                 print(args.out_csv)
                 return 0
 
@@ -485,31 +652,38 @@ def main() -> int:
                     timeout_ms=int(args.timeout_ms),
                     block_resources=block_flag,
                     debug=debug_flag,
+                    engine=args.engine,
+                    api_url=os.getenv("INTER_API_URL") or None,
+                    rps=float(args.rps),
+                    burst=int(args.burst),
+                    run_summary_path=run_summary_path(log_path),
                 )
                 await scraper.start()
                 try:
                     tn_list = [tn for _, tn in items]
                     logging.info("[scrape-to-csv] Scraping first pass: %d items", len(tn_list))
-                    results = await scraper.get_status_many(tn_list, rps=float(args.rps))
-                    status_by_tn = {tn: (raw or "").strip() for tn, raw in results}
+                    results = {r.tracking_number: r for r in await scraper.get_status_results(tn_list, rps=float(args.rps))}
+                    for r in results.values():
+                        metrics.observe_result(r)
 
-                    missing = [tn for tn in tn_list if not status_by_tn.get(tn)]
-                    logging.info("[scrape-to-csv] Missing after pass1: %d", len(missing))
+                    # Second pass only for retryable failures (not not_found / exhausted budgets)
+                    missing = [tn for tn in tn_list if not results[tn].status and results[tn].retryable]
+                    logging.info("[scrape-to-csv] Retryable after pass1: %d", len(missing))
                     if missing:
-                        results2 = await scraper.get_status_many(missing, rps=float(args.rps))
-                        for tn, raw in results2:
-                            if raw:
-                                status_by_tn[tn] = raw.strip()
+                        metrics.SECOND_PASS.inc(len(missing))
+                        for r in await scraper.get_status_results(missing, rps=float(args.rps)):
+                            metrics.observe_result(r)
+                            results[r.tracking_number] = r
 
                     # Write CSV
                     os.makedirs(os.path.dirname(args.out_csv) or ".", exist_ok=True)
                     with open(args.out_csv, "w", newline="", encoding="utf-8") as f:
                         writer = csv.writer(f)
-                        writer.writerow(["row", "tracking", "status_raw", "status_normalized"])
+                        writer.writerow(["row", "tracking", "status_raw", "status_normalized", "error_class"])
                         for row_idx, tn in items:
-                            raw = status_by_tn.get(tn, "")
+                            raw = results[tn].status.strip()
                             norm = TrackerService.normalize_status(raw) if raw else ""
-                            writer.writerow([row_idx, tn, raw, norm])
+                            writer.writerow([row_idx, tn, raw, norm, results[tn].error_class])
                     logging.info("[scrape-to-csv] CSV written: %s", args.out_csv)
                 finally:
                     await scraper.close()
@@ -561,6 +735,15 @@ def main() -> int:
                 timeout_ms=args.timeout_ms,
                 batch_size=args.batch_size,
                 sleep_between_batches=args.sleep_between_batches,
+                engine=args.engine,
+                burst=args.burst,
+                adaptive=args.adaptive,
+                min_concurrency=args.min_concurrency,
+                workers=args.workers,
+                session_guides=args.session_guides,
+                pipeline=args.pipeline,
+                hedge=args.hedge,
+                summary_path=run_summary_path(log_path),
             ))
             name = generate_daily_report(
                 sheets,
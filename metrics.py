@@ -0,0 +1,245 @@
+from __future__ import annotations
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, object]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: _LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+                    for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: "Registry", name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = registry.lock
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    """Monotonic total, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, registry: "Registry", name: str, help_text: str):
+        super().__init__(registry, name, help_text)
+        self._values: Dict[_LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels) -> None:
+        """Mirror a run-wide total kept elsewhere (e.g. a scraper attribute); never decreases."""
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, 0.0), float(value))
+
+    def samples(self) -> Iterable[str]:
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_fmt_labels(key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    """Point-in-time value, optionally split by labels."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (Prometheus layout: _bucket, _sum, _count)."""
+
+    kind = "histogram"
+
+    def __init__(self, registry: "Registry", name: str, help_text: str, buckets: Iterable[float]):
+        super().__init__(registry, name, help_text)
+        self.buckets = tuple(sorted(set(float(b) for b in buckets) | {math.inf}))
+        self._series: Dict[_LabelKey, List[float]] = {}  # per-bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                yield f"{self.name}_bucket{_fmt_labels(key, (('le', _fmt_value(bound)),))} {_fmt_value(cumulative)}"
+            yield f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(series[-2])}"
+            yield f"{self.name}_count{_fmt_labels(key)} {_fmt_value(series[-1])}"
+
+
+class Registry:
+    """Dependency-free metric registry rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, help_text: str, *args) -> _Metric:
+        with self.lock:
+            metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(self, name, help_text, *args)
+            with self.lock:
+                metric = self._metrics.setdefault(name, metric)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float]) -> Histogram:
+        return self._get(Histogram, name, help_text, tuple(buckets))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            with self.lock:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> str:
+        """Atomically write the registry for node_exporter's textfile collector."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+        return path
+
+    def serve(self, port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve GET /metrics from a daemon thread for the lifetime of the process."""
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                return
+
+        server = ThreadingHTTPServer((addr, int(port)), _Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+REGISTRY = Registry()
+
+# Seconds; guide stages and attempts
+LATENCY_BUCKETS_S = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0)
+# Seconds; whole batches
+BATCH_BUCKETS_S = (30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+GUIDES = REGISTRY.counter("recreacion_guides_total", "Lookup results (one per guide per pass), by result: ok or error class")
+ATTEMPTS = REGISTRY.counter("recreacion_attempts_total", "Scrape attempts, including retries")
+RETRIES = REGISTRY.counter("recreacion_retries_total", "Attempts after a guide's first one")
+SECOND_PASS = REGISTRY.counter("recreacion_second_pass_guides_total", "Guides sent to a batch's second pass")
+STAGE_SECONDS = REGISTRY.histogram("recreacion_stage_duration_seconds", "Time per lookup stage", LATENCY_BUCKETS_S)
+BATCH_SECONDS = REGISTRY.histogram("recreacion_batch_duration_seconds", "Wall time per batch", BATCH_BUCKETS_S)
+BROWSER_RSS = REGISTRY.gauge("recreacion_browser_rss_bytes", "RSS of the Playwright driver and Chromium processes")
+SHEETS_CALLS = REGISTRY.counter("recreacion_sheets_api_calls_total", "Sheets API write calls, by method")
+SHEETS_THROTTLED = REGISTRY.counter("recreacion_sheets_throttled_total", "Sheets API 429/quota responses, by method")
+RUN_SECONDS = REGISTRY.gauge("recreacion_run_duration_seconds", "Wall time of the last run, by command")
+RUN_SUCCESS = REGISTRY.gauge("recreacion_run_success", "1 if the last run of the command succeeded")
+RUN_FINISHED = REGISTRY.gauge("recreacion_run_finished_timestamp_seconds", "Unix time the last run finished")
+
+_started = time.monotonic()
+
+
+def observe_result(result) -> None:
+    """Count a final StatusResult and its stage timings."""
+    GUIDES.inc(result=result.error_class or ("ok" if result.status else "empty"))
+    for stage, seconds in result.timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def start_from_env() -> None:
+    """Serve /metrics on METRICS_PORT (bound to METRICS_ADDR, default 127.0.0.1) if set."""
+    port = int(os.getenv("METRICS_PORT", "0") or 0)
+    if port <= 0:
+        return
+    addr = os.getenv("METRICS_ADDR", "127.0.0.1")
+    try:
+        REGISTRY.serve(port, addr)
+        logging.info("[Metrics] Serving http://%s:%d/metrics", addr, port)
+    except OSError as e:
+        logging.warning("[Metrics] Could not bind %s:%d: %s", addr, port, e)
+
+
+def finish_run(command: str, ok: bool) -> None:
+    """Record the run outcome and write METRICS_TEXTFILE (node_exporter textfile collector) if set.
+
+    ``{command}`` in the path is replaced by the subcommand, so timers sharing one
+    collector directory do not overwrite each other's file.
+    """
+    RUN_SECONDS.set(time.monotonic() - _started, command=command)
+    RUN_SUCCESS.set(1 if ok else 0, command=command)
+    RUN_FINISHED.set(time.time(), command=command)
+    path = os.getenv("METRICS_TEXTFILE")
+    if not path:
+        return
+    path = path.replace("{command}", command)
+    try:
+        REGISTRY.write_textfile(path)
+        logging.info("[Metrics] Textfile written: %s", path)
+    except OSError as e:
+        logging.warning("[Metrics] Could not write %s: %s", path, e)
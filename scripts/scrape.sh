@@ -22,8 +22,16 @@ python -m recreacion_linux.main scrape \
   --end-row "${END_ROW:-}" \
   --only-empty "${ONLY_EMPTY:-true}" \
   --max-concurrency "${MAX_CONCURRENCY:-2}" \
+  --adaptive "${ADAPTIVE:-false}" \
+  --min-concurrency "${MIN_CONCURRENCY:-1}" \
+  --workers "${WORKERS:-1}" \
+  --session-guides "${SESSION_GUIDES:-0}" \
+  --pipeline "${PIPELINE:-false}" \
+  --hedge "${HEDGE:-false}" \
   --rps "${RPS:-0.8}" \
+  --burst "${BURST:-1}" \
   --retries "${RETRIES:-1}" \
   --timeout-ms "${TIMEOUT_MS:-25000}" \
   --batch-size "${BATCH_SIZE:-1500}" \
-  --sleep-between-batches "${SLEEP_BETWEEN_BATCHES:-15.0}"
+  --sleep-between-batches "${SLEEP_BETWEEN_BATCHES:-15.0}" \
+  --engine "${SCRAPER_ENGINE:-browser}"
@@ -16,7 +16,7 @@ PACKAGE_PARENT = os.path.dirname(PROJECT_ROOT)
 if PACKAGE_PARENT not in sys.path:
     sys.path.insert(0, PACKAGE_PARENT)
 
-from recreacion_linux.logging_setup import setup_file_logging
+from recreacion_linux.logging_setup import run_summary_path, setup_file_logging
 from recreacion_linux.config import settings
 from recreacion_linux.services.sheets_client import SheetsClient
 from recreacion_linux.services.tracker_service import TrackerService
@@ -59,6 +59,8 @@ async def scrape_to_csv(
     rps: float | None = 0.6,
     retries: int = 2,
     timeout_ms: int = 60000,
+    engine: str = "browser",
+    summary_path: str | None = None,
 ) -> str:
     """Read first N tracking numbers from the sheet and write results to a CSV.
 
@@ -93,7 +95,7 @@ async def scrape_to_csv(
         os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
         with open(out_csv, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
-            writer.writerow(["row", "tracking", "status_raw", "status_normalized"])
+            writer.writerow(["row", "tracking", "status_raw", "status_normalized", "error_class"])
         return out_csv
 
     # Resolve headless flag: env or settings fallback
@@ -119,32 +121,32 @@ async def scrape_to_csv(
         timeout_ms=timeout_ms,
         block_resources=block_flag,
         debug=debug_flag,
+        engine=engine,
+        api_url=os.getenv("INTER_API_URL") or None,
+        run_summary_path=summary_path,
     )
     await scraper.start()
 
     try:
         tn_list = [tn for _, tn in items]
-        results = await scraper.get_status_many(tn_list, rps=rps)
-        status_by_tn = {tn: (raw or "").strip() for tn, raw in results}
+        results = {r.tracking_number: r for r in await scraper.get_status_results(tn_list, rps=rps)}
 
-        # Second pass for blanks only
-        missing = [tn for tn in tn_list if not status_by_tn.get(tn)]
+        # Second pass for retryable blanks only (not not_found / exhausted budgets)
+        missing = [tn for tn in tn_list if not results[tn].status and results[tn].retryable]
         if missing:
             logging.info("Second pass for %d missing", len(missing))
-            results2 = await scraper.get_status_many(missing, rps=(rps or 0.6))
-            for tn, raw in results2:
-                if raw:
-                    status_by_tn[tn] = raw.strip()
+            for r in await scraper.get_status_results(missing, rps=(rps or 0.6)):
+                results[r.tracking_number] = r
 
         # Write CSV
         os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
         with open(out_csv, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
-            writer.writerow(["row", "tracking", "status_raw", "status_normalized"])
+            writer.writerow(["row", "tracking", "status_raw", "status_normalized", "error_class"])
             for row_idx, tn in items:
-                raw = status_by_tn.get(tn, "")
+                raw = results[tn].status.strip()
                 norm = TrackerService.normalize_status(raw) if raw else ""
-                writer.writerow([row_idx, tn, raw, norm])
+                writer.writerow([row_idx, tn, raw, norm, results[tn].error_class])
         logging.info("Wrote CSV: %s", out_csv)
         return out_csv
     finally:
@@ -161,6 +163,7 @@ def _build_parser() -> argparse.ArgumentParser:
     p.add_argument("--rps", type=float, default=0.6)
     p.add_argument("--retries", type=int, default=2)
     p.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=60000)
+    p.add_argument("--engine", choices=["browser", "http"], default=os.getenv("SCRAPER_ENGINE", "browser"))
     return p
 
 
@@ -193,6 +196,8 @@ def main() -> int:
             rps=args.rps,
             retries=args.retries,
             timeout_ms=args.timeout_ms,
+            engine=args.engine,
+            summary_path=run_summary_path(log_path),
         ))
         print(out)
         return 0
@@ -5,6 +5,8 @@ import logging
 from datetime import datetime
 import time
 
+from recreacion_linux import metrics
+
 
 class SheetsClient:
     """Encapsulates operations on the tracking spreadsheet using gspread.
@@ -80,12 +82,14 @@ class SheetsClient:
         # Simple retry with backoff to handle 429 rate limit bursts
         delay = 1.0
         for attempt in range(5):
+            metrics.SHEETS_CALLS.inc(method="update_range")
             try:
                 self.sheet().update(a1_range, values)
                 return
             except Exception as e:
                 msg = str(e)
                 if "429" in msg or "quota" in msg.lower():
+                    metrics.SHEETS_THROTTLED.inc(method="update_range")
                     logging.warning("Sheets update_range throttled (attempt %d): %s", attempt + 1, msg)
                     time.sleep(delay)
                     delay = min(delay * 2, 30)
@@ -103,12 +107,14 @@ class SheetsClient:
         }
         delay = 1.0
         for attempt in range(5):
+            metrics.SHEETS_CALLS.inc(method="values_batch_update")
             try:
                 # gspread exposes Spreadsheet.values_batch_update
                 return self.spreadsheet.values_batch_update(body)
             except Exception as e:
                 msg = str(e)
                 if "429" in msg or "quota" in msg.lower():
+                    metrics.SHEETS_THROTTLED.inc(method="values_batch_update")
                     logging.warning("Sheets values_batch_update throttled (attempt %d): %s", attempt + 1, msg)
                     time.sleep(delay)
                     delay = min(delay * 2, 30)
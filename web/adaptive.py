@@ -0,0 +1,102 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+
+# Outcomes that make the controller back off
+BACKOFF_OUTCOMES = {"timeout", "navigation", "empty", "error"}
+
+
+class AdaptiveLimiter:
+    """Semaphore-like concurrency gate whose limit can change while in use."""
+
+    def __init__(self, limit: int):
+        self._limit = max(1, int(limit))
+        self._in_use = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    async def set_limit(self, limit: int) -> None:
+        async with self._cond:
+            self._limit = max(1, int(limit))
+            self._cond.notify_all()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_use < self._limit)
+            self._in_use += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+
+class AimdController:
+    """Additive-increase / multiplicative-decrease controller for scraper concurrency.
+
+    - Each healthy result (fast enough, empty rate under threshold) adds 1/limit,
+      i.e. +1 slot per round of successful guides.
+    - A timeout, navigation error, exception or empty extraction multiplies the
+      limit by ``decrease_factor`` (at most once per ``cooldown_s``).
+    - The limit always stays within [floor, ceiling].
+    """
+
+    def __init__(self, floor: int, ceiling: int, target_latency_s: float,
+                 max_empty_rate: float = 0.2, decrease_factor: float = 0.5,
+                 cooldown_s: float = 10.0, alpha: float = 0.2):
+        self.floor = max(1, int(floor))
+        self.ceiling = max(self.floor, int(ceiling))
+        self.target_latency_s = float(target_latency_s)
+        self.max_empty_rate = float(max_empty_rate)
+        self.decrease_factor = float(decrease_factor)
+        self.cooldown_s = float(cooldown_s)
+        self._alpha = float(alpha)
+        self.limit = float(self.floor)
+        self.latency_ewma: float | None = None
+        self.empty_ewma = 0.0
+        self._last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def concurrency(self) -> int:
+        return int(self.limit)
+
+    def observe(self, outcome: str, latency_s: float) -> bool:
+        """Feed one guide outcome. Returns True if the integer concurrency changed."""
+        before = self.concurrency
+        a = self._alpha
+        self.empty_ewma = (1 - a) * self.empty_ewma + a * (1.0 if outcome == "empty" else 0.0)
+        if outcome in BACKOFF_OUTCOMES:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown_s:
+                self._last_decrease = now
+                self.limit = max(float(self.floor), self.limit * self.decrease_factor)
+                self.decreases += 1
+        else:
+            self.latency_ewma = latency_s if self.latency_ewma is None else (1 - a) * self.latency_ewma + a * latency_s
+            if self.latency_ewma <= self.target_latency_s and self.empty_ewma <= self.max_empty_rate:
+                self.limit = min(float(self.ceiling), self.limit + 1.0 / max(1.0, self.limit))
+        after = self.concurrency
+        if after != before:
+            if after > before:
+                self.increases += 1
+            logging.info("[AIMD] concurrency %d -> %d (outcome=%s latency_ewma=%.1fs empty_rate=%.0f%%)",
+                         before, after, outcome, self.latency_ewma or 0.0, self.empty_ewma * 100)
+            return True
+        return False
+
+    def stats(self) -> str:
+        return (f"aimd concurrency={self.concurrency} range=[{self.floor},{self.ceiling}] "
+                f"increases={self.increases} decreases={self.decreases}")
@@ -0,0 +1,177 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterable, Pattern
+from urllib.parse import urlsplit
+
+# Response headers that no longer apply once the decoded body is replayed
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+
+class StaticAssetCache:
+    """Content-addressed, on-disk cache for the tracking site's static JS/CSS bundles.
+
+    Installed as a context route, so it is shared by every context and survives
+    across runs. Layout under ``root``:
+      - ``blobs/<sha256 of body>``: response bodies (deduplicated)
+      - ``index/<sha256 of url>.json``: url, blob, status, headers, stored_at
+    Entries expire after ``ttl_s``; the least recently used entries are evicted when
+    the blobs exceed ``max_bytes``.
+    """
+
+    def __init__(self, root: str, ttl_s: float = 86400.0, max_bytes: int = 200 * 1_048_576,
+                 hosts: Iterable[str] = ("interrapidisimo.com",), extensions: Iterable[str] = ("js", "css")):
+        self.root = root
+        self.ttl_s = float(ttl_s)
+        self.max_bytes = int(max_bytes)
+        self.hosts = tuple(hosts)
+        self.extensions = tuple(extensions)
+        self._blobs = os.path.join(root, "blobs")
+        self._index = os.path.join(root, "index")
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._index, exist_ok=True)
+        self._total_bytes = sum(e.stat().st_size for e in os.scandir(self._blobs) if e.is_file())
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+    # --- Route integration ---
+    def route_pattern(self) -> Pattern[str]:
+        """JS/CSS URLs on the cached hosts (apex or subdomain), so other sites' bundles never
+        reach Python. A regex rather than a glob: Playwright before 1.52 treats ``?`` in
+        globs as a wildcard, which would let e.g. ``x.json`` into the cache."""
+        hosts = "|".join(re.escape(h) for h in self.hosts)
+        exts = "|".join(re.escape(e) for e in self.extensions)
+        return re.compile(rf"^https?://(?:[^/?#]+\.)?(?:{hosts})(?::\d+)?/[^?#]*\.(?:{exts})(?:[?#].*)?$",
+                          re.IGNORECASE)
+
+    async def install(self, context) -> None:
+        await context.route(self.route_pattern(), self._handle)
+
+    def _cacheable(self, request) -> bool:
+        if request.method != "GET":
+            return False
+        host = urlsplit(request.url).hostname or ""
+        return any(host == h or host.endswith("." + h) for h in self.hosts)
+
+    async def _handle(self, route) -> None:
+        request = route.request
+        if not self._cacheable(request):
+            await route.fallback()
+            return
+        url = request.url
+        try:
+            entry = await asyncio.to_thread(self._lookup, url)
+            if entry is not None:
+                meta, body = entry
+                self.hits += 1
+                self.bytes_served += len(body)
+                await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+                return
+            self.misses += 1
+            resp = await route.fetch()
+            body = await resp.body()
+            if resp.status == 200 and body:
+                await asyncio.to_thread(self._store, url, resp.status, resp.headers, body)
+            await route.fulfill(response=resp, body=body)
+        except Exception as e:
+            logging.debug("[CACHE] Falling back to network for %s: %s", url, e)
+            try:
+                await route.fallback()
+            except Exception:
+                pass
+
+    # --- Disk store (runs in a worker thread) ---
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, url: str):
+        index_path = os.path.join(self._index, self._key(url) + ".json")
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if time.time() - meta["stored_at"] > self.ttl_s:
+                return None
+            with open(os.path.join(self._blobs, meta["blob"]), "rb") as f:
+                body = f.read()
+            os.utime(index_path)  # LRU bookkeeping
+            return meta, body
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        blob = hashlib.sha256(body).hexdigest()
+        blob_path = os.path.join(self._blobs, blob)
+        if not os.path.exists(blob_path):
+            tmp = blob_path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, blob_path)
+            self._total_bytes += len(body)
+            self.bytes_stored += len(body)
+        meta = {
+            "url": url,
+            "blob": blob,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS},
+            "stored_at": time.time(),
+        }
+        index_path = os.path.join(self._index, self._key(url) + ".json")
+        tmp = index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, index_path)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used index entries, then unreferenced blobs, down to 90% of the cap."""
+        entries = []
+        for e in os.scandir(self._index):
+            if not e.name.endswith(".json"):
+                continue
+            try:
+                with open(e.path, "r", encoding="utf-8") as f:
+                    entries.append((e.stat().st_mtime, e.path, json.load(f).get("blob")))
+            except (OSError, ValueError):
+                continue
+        entries.sort()
+        refs: Dict[str, int] = {}
+        for _, _, blob in entries:
+            refs[blob] = refs.get(blob, 0) + 1
+        target = int(self.max_bytes * 0.9)
+        for _, path, blob in entries:
+            if self._total_bytes <= target:
+                break
+            _remove_quietly(path)
+            refs[blob] -= 1
+            if blob and refs[blob] == 0:
+                blob_path = os.path.join(self._blobs, blob)
+                try:
+                    self._total_bytes -= os.path.getsize(blob_path)
+                except OSError:
+                    pass
+                _remove_quietly(blob_path)
+
+    # --- Reporting ---
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        ratio = (self.hits / lookups * 100) if lookups else 0.0
+        return (f"asset cache hits={self.hits} misses={self.misses} hit_ratio={ratio:.0f}% "
+                f"served={self.bytes_served / 1_048_576:.1f}MB stored={self.bytes_stored / 1_048_576:.1f}MB "
+                f"size={self._total_bytes / 1_048_576:.1f}MB")
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import time
+import urllib.request
+from contextlib import suppress
+
+from recreacion_linux.web.inter_scraper_async import CHROMIUM_ARGS
+
+DEFAULT_PORT = 9222
+
+
+def _established_connections(port: int) -> int:
+    """Count ESTABLISHED TCP connections whose local port is ``port`` (i.e. attached clients)."""
+    count = 0
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table, "r", encoding="ascii") as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 4 or fields[3] != "01":
+                        continue
+                    if int(fields[1].rsplit(":", 1)[1], 16) == port:
+                        count += 1
+        except OSError:
+            continue
+    return count
+
+
+class BrowserServer:
+    """Resident Chromium that scraper runs attach to over CDP (``BROWSER_ENDPOINT``).
+
+    - Chromium listens on ``127.0.0.1:<port>`` with a persistent ``--user-data-dir``.
+    - If Chromium exits unexpectedly it is relaunched (exponential backoff, at most
+      ``max_restarts`` within ``restart_window_s``).
+    - When no client has been attached for ``idle_timeout_s`` the browser is stopped
+      and ``serve()`` returns; the next run falls back to (or restarts) the server.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, headless: bool = True, user_data_dir: str | None = None,
+                 idle_timeout_s: float = 2700.0, poll_s: float = 5.0, max_restarts: int = 5,
+                 restart_window_s: float = 600.0):
+        self.port = int(port)
+        self.headless = headless
+        state_dir = os.getenv("SCRAPER_STATE_DIR") or os.path.join(os.getcwd(), "state")
+        self.user_data_dir = user_data_dir or os.path.join(state_dir, "browser-profile")
+        self.idle_timeout_s = float(idle_timeout_s)
+        self.poll_s = float(poll_s)
+        self.max_restarts = max(0, int(max_restarts))
+        self.restart_window_s = float(restart_window_s)
+        self._proc: subprocess.Popen | None = None
+        self._stop = asyncio.Event()
+        self._restarts: list[float] = []
+        self.launches = 0
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _executable_path(self) -> str:
+        from playwright.async_api import async_playwright
+        pw = await async_playwright().start()
+        try:
+            return pw.chromium.executable_path
+        finally:
+            await pw.stop()
+
+    def _launch(self, executable: str) -> None:
+        os.makedirs(self.user_data_dir, exist_ok=True)
+        args = [
+            executable,
+            f"--remote-debugging-port={self.port}",
+            "--remote-debugging-address=127.0.0.1",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *CHROMIUM_ARGS,
+        ]
+        if self.headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+        self._proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.launches += 1
+        logging.info("[BrowserServer] Chromium started pid=%s endpoint=%s", self._proc.pid, self.endpoint)
+
+    def _endpoint_ready(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.endpoint + "/json/version", timeout=2) as resp:
+                return bool(json.load(resp).get("webSocketDebuggerUrl"))
+        except Exception:
+            return False
+
+    async def _wait_ready(self, timeout_s: float = 30.0) -> bool:
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            if self._proc is not None and self._proc.poll() is not None:
+                return False
+            if await asyncio.to_thread(self._endpoint_ready):
+                return True
+            await asyncio.sleep(0.25)
+        return False
+
+    def _terminate(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait(timeout=5)
+
+    def _allow_restart(self) -> bool:
+        now = time.monotonic()
+        self._restarts = [t for t in self._restarts if now - t < self.restart_window_s]
+        if len(self._restarts) >= self.max_restarts:
+            return False
+        self._restarts.append(now)
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def serve(self) -> int:
+        """Run until idle timeout, a signal, or too many crashes. Returns an exit code."""
+        if await asyncio.to_thread(self._endpoint_ready):
+            logging.info("[BrowserServer] %s is already served by another process", self.endpoint)
+            return 0
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(sig, self.stop)
+
+        executable = await self._executable_path()
+        self._launch(executable)
+        if not await self._wait_ready():
+            logging.error("[BrowserServer] Chromium did not expose %s", self.endpoint)
+            self._terminate()
+            return 1
+
+        last_active = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.poll_s)
+                if self._stop.is_set():
+                    break
+                if self._proc is None or self._proc.poll() is not None:
+                    code = self._proc.returncode if self._proc else None
+                    if not self._allow_restart():
+                        logging.error("[BrowserServer] Chromium keeps exiting (last code=%s); giving up", code)
+                        return 1
+                    backoff = min(30.0, 2.0 ** (len(self._restarts) - 1))
+                    logging.warning("[BrowserServer] Chromium exited (code=%s); relaunching in %.0fs", code, backoff)
+                    await asyncio.sleep(backoff)
+                    self._launch(executable)
+                    await self._wait_ready()
+                    last_active = time.monotonic()
+                    continue
+                clients = _established_connections(self.port)
+                now = time.monotonic()
+                if clients:
+                    last_active = now
+                elif now - last_active >= self.idle_timeout_s:
+                    logging.info("[BrowserServer] Idle for %.0fs; shutting down", now - last_active)
+                    break
+            return 0
+        finally:
+            self._terminate()
+            logging.info("[BrowserServer] Stopped (launches=%d)", self.launches)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Awaitable, Callable, List
+
+
+class PooledContext:
+    """A browser context plus its working page, recycled across guides."""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.created_at = time.monotonic()
+        # Page carries the window.open override used by the cached popup flow
+        self.open_patched = False
+        # Session mode: guides served since the last full navigation, and whether the
+        # page is still on a healthy tracking view
+        self.session_guides = 0
+        self.session_ready = False
+        # Pipeline mode: page was pre-navigated to the landing page (input visible, consent handled)
+        self.landing_ready = False
+
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class ContextPool:
+    """Bounded pool of pre-initialized contexts/pages.
+
+    - At most ``size`` contexts exist at the same time (idle + in use).
+    - A context is evicted when it reaches ``max_uses`` guides or ``max_age_s`` seconds.
+    - ``release(slot, healthy=False)`` discards the context instead of recycling it.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[PooledContext]], size: int,
+                 max_uses: int = 50, max_age_s: float = 600.0):
+        self._factory = factory
+        self.size = max(1, int(size))
+        self.max_uses = max(1, int(max_uses))
+        self.max_age_s = float(max_age_s)
+        self._idle: List[PooledContext] = []
+        self._sem = asyncio.Semaphore(self.size)
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.recycles = 0
+
+    def _expired(self, slot: PooledContext) -> bool:
+        return slot.uses >= self.max_uses or slot.age() >= self.max_age_s
+
+    async def acquire(self) -> PooledContext:
+        await self._sem.acquire()
+        return await self._take()
+
+    async def try_acquire(self) -> PooledContext | None:
+        """Acquire without waiting; None when the pool is at capacity."""
+        if self._sem.locked():
+            return None
+        await self._sem.acquire()
+        return await self._take()
+
+    def has_capacity(self) -> bool:
+        """True if acquire() would not wait (a slot is idle or can be created)."""
+        return not self._sem.locked()
+
+    def _pop_idle(self) -> PooledContext:
+        # Prefer pages that are already on the landing/tracking view
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i].landing_ready or self._idle[i].session_ready:
+                return self._idle.pop(i)
+        return self._idle.pop()
+
+    async def _take(self) -> PooledContext:
+        try:
+            while self._idle:
+                slot = self._pop_idle()
+                if self._expired(slot):
+                    self.recycles += 1
+                    await self._discard(slot)
+                    continue
+                self.hits += 1
+                break
+            else:
+                self.misses += 1
+                slot = await self._factory()
+            slot.uses += 1
+            return slot
+        except BaseException:
+            self._sem.release()
+            raise
+
+    async def release(self, slot: PooledContext, healthy: bool = True, keep_page: bool = False) -> None:
+        """Return a slot. ``keep_page`` leaves the page where it is (session mode)."""
+        try:
+            if healthy and not self._expired(slot) and await self._reset(slot, keep_page):
+                self._idle.append(slot)
+            else:
+                self.recycles += 1
+                await self._discard(slot)
+        finally:
+            self._sem.release()
+
+    async def _reset(self, slot: PooledContext, keep_page: bool = False) -> bool:
+        """Close stray pages (popups) and blank the working page. False if unusable."""
+        try:
+            for p in list(slot.context.pages):
+                if p is not slot.page:
+                    with suppress(Exception):
+                        await p.close()
+            if slot.page.is_closed():
+                return False
+            if not keep_page or not (slot.session_ready or slot.landing_ready):
+                slot.session_ready = False
+                slot.landing_ready = False
+                await slot.page.goto("about:blank", timeout=5000)
+            return True
+        except Exception as e:
+            logging.debug("[PW] Pool reset failed: %s", e)
+            return False
+
+    async def _discard(self, slot: PooledContext) -> None:
+        with suppress(Exception):
+            await slot.context.close()
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    def stats(self) -> str:
+        return f"pool size={self.size} idle={len(self._idle)} hits={self.hits} misses={self.misses} recycles={self.recycles}"
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import gzip
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Tuple
+
+# Already-compressed formats are written as-is
+_RAW_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+
+class DebugArtifactWriter:
+    """Background writer for debug artifacts (HTML, screenshots, console/network journals).
+
+    - The event loop only enqueues bytes; a daemon thread compresses (gzip, except
+      images) and writes them under ``log_dir``. When the queue is full the
+      artifact is dropped instead of blocking the loop.
+    - ``allow(error_class)`` samples the first ``per_class`` captures of each error
+      class per run, so an outage does not dump every guide.
+    - Files named ``<prefix>_*`` in ``log_dir`` older than ``max_age_s`` are removed,
+      then the oldest ones until the total is under ``max_bytes`` (at startup and
+      whenever the running total crosses the cap).
+    """
+
+    def __init__(self, log_dir: str = "logs", prefix: str = "debug", per_class: int = 3,
+                 max_age_s: float = 7 * 86400.0, max_bytes: int = 200 * 1_048_576, queue_size: int = 64):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.per_class = max(0, int(per_class))
+        self.max_age_s = float(max_age_s)
+        self.max_bytes = int(max_bytes)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._sampled: Dict[str, int] = {}
+        self._total_bytes = 0
+        # Counters
+        self.written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.pruned = 0
+
+    @classmethod
+    def from_env(cls, log_dir: str = "logs", prefix: str = "debug") -> "DebugArtifactWriter":
+        return cls(
+            log_dir=log_dir,
+            prefix=prefix,
+            per_class=int(os.getenv("DEBUG_SAMPLES_PER_CLASS", "3")),
+            max_age_s=float(os.getenv("DEBUG_RETENTION_DAYS", "7")) * 86400.0,
+            max_bytes=int(float(os.getenv("DEBUG_MAX_MB", "200")) * 1_048_576),
+        )
+
+    def allow(self, error_class: str) -> bool:
+        """Reserve a capture for ``error_class``; False once its sample quota is used."""
+        key = error_class or "error"
+        with self._lock:
+            taken = self._sampled.get(key, 0)
+            if taken >= self.per_class:
+                self.skipped += 1
+                return False
+            self._sampled[key] = taken + 1
+            return True
+
+    def submit(self, name: str, data: bytes | str) -> None:
+        """Queue ``data`` to be written as ``log_dir/name`` (``.gz`` appended unless it is an image)."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((name, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="debug-artifacts", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        self._prune()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, data = item
+            try:
+                self._write(name, data)
+            except Exception as e:
+                logging.debug("[Debug] Could not write %s: %s", name, e)
+            if self._total_bytes > self.max_bytes:
+                self._prune()
+
+    def _write(self, name: str, data: bytes) -> None:
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, name)
+        if name.lower().endswith(_RAW_SUFFIXES):
+            payload = data
+        else:
+            path += ".gz"
+            payload = gzip.compress(data, compresslevel=6)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        self.written += 1
+        self.bytes_written += len(payload)
+        self._total_bytes += len(payload)
+
+    def _scan(self) -> list[Tuple[float, int, str]]:
+        entries = []
+        with os.scandir(self.log_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.startswith(self.prefix + "_"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _prune(self) -> None:
+        """Apply the age limit, then evict the oldest artifacts down to 80% of max_bytes."""
+        try:
+            entries = sorted(self._scan())
+        except OSError:
+            return
+        now = time.time()
+        keep = []
+        for mtime, size, path in entries:
+            if now - mtime > self.max_age_s:
+                self._remove(path)
+            else:
+                keep.append((mtime, size, path))
+        total = sum(size for _, size, _ in keep)
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.8)
+            for _mtime, size, path in keep:
+                if total <= target:
+                    break
+                if self._remove(path):
+                    total -= size
+        self._total_bytes = total
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            self.pruned += 1
+            return True
+        except OSError:
+            return False
+
+    def close(self, timeout_s: float = 30.0) -> None:
+        """Flush queued artifacts and stop the writer thread (blocking; call via to_thread)."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout_s)
+        self._thread = None
+
+    def summary(self) -> str:
+        sampled = ", ".join(f"{k}={v}" for k, v in sorted(self._sampled.items())) or "none"
+        return (f"debug artifacts written={self.written} ({self.bytes_written / 1_048_576:.1f}MB gz) "
+                f"sampled[{sampled}] skipped={self.skipped} dropped={self.dropped} pruned={self.pruned}")
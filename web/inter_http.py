@@ -0,0 +1,140 @@
+from __future__ import annotations
+import logging
+import os
+from typing import Any, Tuple
+from urllib.parse import quote
+
+# Keys that carry the current state inside a guide record, by preference
+STATUS_KEYS = (
+    "descripcionestadoguia",
+    "estadoactual",
+    "estadoguia",
+    "descripcionestado",
+    "estado",
+)
+# When a status key holds an object, read its description from these keys
+DESCRIPTION_KEYS = ("descripcion", "nombre", "estado", "description", "name")
+# Keys that identify a guide record (compared without case or underscores)
+GUIDE_KEYS = ("numeroguia", "numerodeguia", "numguia", "idguia", "guia")
+# Envelope keys that mark an error response rather than a tracking result
+ERROR_KEYS = ("error", "errors", "errores", "mensajeerror", "exception", "excepcion")
+SUCCESS_KEYS = ("success", "exito", "ok", "isvalid", "esvalido")
+
+
+def _norm(key: Any) -> str:
+    return str(key).lower().replace("_", "")
+
+
+def _text_of(value: Any) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        lowered = {_norm(k): v for k, v in value.items()}
+        for key in DESCRIPTION_KEYS:
+            v = lowered.get(key)
+            if isinstance(v, str) and v.strip():
+                return v.strip()
+    return ""
+
+
+def _is_error_envelope(payload: Any) -> bool:
+    if not isinstance(payload, dict):
+        return False
+    lowered = {_norm(k): v for k, v in payload.items()}
+    if any(lowered.get(k) for k in ERROR_KEYS):
+        return True
+    return any(lowered.get(k) is False for k in SUCCESS_KEYS)
+
+
+def _guide_records(payload: Any, tracking_number: str | None):
+    """Yield dicts that identify a guide (breadth-first), matching ``tracking_number`` if given."""
+    queue = [payload]
+    while queue:
+        node = queue.pop(0)
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if _norm(k) in GUIDE_KEYS and isinstance(v, (str, int)):
+                    if tracking_number is None or str(v).strip() == tracking_number:
+                        yield node
+                    break
+            queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            # Only the first guide of a list response is relevant
+            queue.extend(node[:1])
+
+
+def extract_status_from_payload(payload: Any, tracking_number: str | None = None) -> str:
+    """Return the current status of the guide record in a tracking JSON payload ("" if none).
+
+    Only a record carrying a guide number (``tracking_number`` when given) is read, so
+    error envelopes and unrelated ``estado`` fields elsewhere in the payload are ignored.
+    """
+    if _is_error_envelope(payload):
+        return ""
+    for record in _guide_records(payload, tracking_number):
+        lowered = {_norm(k): v for k, v in record.items()}
+        for key in STATUS_KEYS:
+            txt = _text_of(lowered.get(key))
+            if txt:
+                return txt
+    return ""
+
+
+class InterHttpClient:
+    """Browserless client for the tracking backend using a pooled httpx.AsyncClient."""
+
+    def __init__(self, api_url: str | None = None, timeout_ms: int = 30000, max_connections: int = 10,
+                 proxy_server: str | None = None, proxy_username: str | None = None,
+                 proxy_password: str | None = None):
+        self.api_url = api_url or os.getenv("INTER_API_URL") or ""
+        self._timeout = max(1.0, timeout_ms / 1000.0)
+        self._max_connections = max(1, int(max_connections))
+        self._proxy_server = proxy_server
+        self._proxy_username = proxy_username
+        self._proxy_password = proxy_password
+        self._client = None
+
+    def _proxy_url(self) -> str | None:
+        """Proxy URL for httpx, with the same credentials the browser launch uses."""
+        if not self._proxy_server:
+            return None
+        server = self._proxy_server if "://" in self._proxy_server else f"http://{self._proxy_server}"
+        if not self._proxy_username:
+            return server
+        scheme, rest = server.split("://", 1)
+        userinfo = f"{quote(self._proxy_username, safe='')}:{quote(self._proxy_password or '', safe='')}"
+        return f"{scheme}://{userinfo}@{rest}"
+
+    async def start(self):
+        if "{tracking}" not in self.api_url:
+            raise RuntimeError("INTER_API_URL must be set to the tracking endpoint (with {tracking})")
+        import httpx  # optional dependency, only needed for engine=http
+
+        headers = {
+            "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                           "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"),
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Language": "es-CO,es;q=0.9,en;q=0.8",
+            "Referer": "https://interrapidisimo.com/sigue-tu-envio/",
+        }
+        limits = httpx.Limits(max_connections=self._max_connections,
+                              max_keepalive_connections=self._max_connections)
+        kwargs: dict = {"headers": headers, "limits": limits, "timeout": self._timeout}
+        proxy = self._proxy_url()
+        if proxy:
+            kwargs["proxy"] = proxy
+        self._client = httpx.AsyncClient(**kwargs)
+        logging.info("[HTTP] Client ready. api_url=%s max_connections=%d", self.api_url, self._max_connections)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, tracking_number: str) -> Tuple[str, Any]:
+        """Return (status, payload). Raises on transport/HTTP errors."""
+        url = self.api_url.replace("{tracking}", tracking_number)
+        resp = await self._client.get(url)
+        resp.raise_for_status()
+        payload = resp.json()
+        return extract_status_from_payload(payload, tracking_number), payload
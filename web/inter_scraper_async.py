@@ -1,11 +1,226 @@
 from __future__ import annotations
 import asyncio
+import heapq
+import itertools
+import json
 import logging
+import os
+import re
+import time
+from collections import deque
 from contextlib import suppress
-from typing import Iterable, List, Tuple
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, Tuple
 
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
+from recreacion_linux.web.context_pool import ContextPool, PooledContext
+from recreacion_linux.web.inter_http import InterHttpClient, extract_status_from_payload
+from recreacion_linux.web.rate_limit import TokenBucket
+from recreacion_linux.web.adaptive import AdaptiveLimiter, AimdController
+from recreacion_linux.web.resource_blocking import BlockPolicy, BlockStats, install_blocking
+from recreacion_linux.web.asset_cache import StaticAssetCache
+from recreacion_linux.web.debug_artifacts import DebugArtifactWriter
+from recreacion_linux.web.memory_watchdog import RssWindow, descendant_rss_bytes
+from recreacion_linux.web.retry_budget import GuideBudget
+from recreacion_linux.web.stage_timings import StageClock, StageHistograms
+from recreacion_linux.web import status_result as errors
+from recreacion_linux.web.status_result import NOT_FOUND_RE, PERMANENT_ERRORS, StatusResult
+
+# XHR/fetch calls that feed the SiguetuEnvio/Shipment iframe with the guide data
+TRACKING_RESPONSE_RE = re.compile(r"SiguetuEnvio|Shipment|Rastreo|Guia", re.IGNORECASE)
+
+LANDING_URL = "https://interrapidisimo.com/sigue-tu-envio/"
+
+# Chromium flags shared by local launches and the resident browser server
+CHROMIUM_ARGS = (
+    "--disable-blink-features=AutomationControlled",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-gpu",
+    "--window-size=1280,800",
+)
+# Search input (desktop/mobile variants)
+_INPUT_CSS = "#inputGuide:visible, #inputGuideMovil:visible, input.buscarGuiaInput:visible"
+# Tracking view iframe injected after a search
+_RESULT_IFRAME_CSS = "iframe.iframe-sigue-tu-envio, iframe[src*='SiguetuEnvio'], iframe[src*='Shipment']"
+
+# Session mode: drop the previous guide's result iframe before re-searching
+_CLEAR_RESULT_JS = """
+() => document.querySelectorAll(
+  "iframe.iframe-sigue-tu-envio, iframe[src*='SiguetuEnvio'], iframe[src*='Shipment']"
+).forEach((f) => f.remove())
+"""
+
+# Short visible messages of the tracking view (alerts/modals and leaf elements), checked
+# against NOT_FOUND_RE one by one instead of the whole body text
+_VIEW_MESSAGES_JS = """
+() => {
+  const out = [];
+  const boxes = "[role=alert], .alert, .swal2-title, .swal2-html-container, .modal-body, .toast, .mensaje, .message";
+  for (const el of document.body ? document.body.querySelectorAll("*") : []) {
+    if (el.children.length && !el.matches(boxes)) continue;
+    if (!el.getClientRects().length || getComputedStyle(el).visibility === 'hidden') continue;
+    const text = (el.innerText || '').trim();
+    if (text && text.length <= 160) out.push(text);
+    if (out.length >= 300) break;
+  }
+  return out;
+}
+"""
+
+# Cold start (no saved consent state): how long one guide waits for the async-injected cookie banner
+_CONSENT_WAIT_MS = 5000
+
+# How long the cached popup flow waits for the same-page navigation before looking for a real popup
+_SAME_PAGE_NAV_MS = 3000
+
+# Popup flow: open the tracking view in the same page instead of a new target
+_SAME_PAGE_OPEN_JS = """
+window.open = function (url) {
+  if (url) { window.location.assign(url); }
+  return window;
+};
+"""
+
+# Injected extractor: evaluates every selector strategy on each DOM mutation and
+# resolves with the first match (in priority order) or "" when the timeout elapses.
+_STATUS_EXTRACTOR_JS = """
+([timeoutMs, generic]) => new Promise((resolve) => {
+  const visible = (el) => !!el && el.getClientRects().length > 0
+    && getComputedStyle(el).visibility !== 'hidden';
+  const nextValue = (anchor) => {
+    for (let n = anchor && anchor.nextElementSibling; n; n = n.nextElementSibling) {
+      if (n.matches('p.font-weight-600')) return n;
+    }
+    return null;
+  };
+  const byXPath = (xp) => document.evaluate(xp, document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  const strategies = [
+    ['title_sibling', 0, () => nextValue(document.querySelector('div.content p.title-current-state'))],
+    ['title_text', 0, () => {
+      const xp = "(//*[self::p or self::h1 or self::h2 or self::div][contains(normalize-space(.), 'Estado actual')])[1]";
+      const t = byXPath(xp);
+      return t && (nextValue(t) || byXPath(xp + "/following::p[contains(@class,'font-weight-600')][1]"));
+    }],
+    ['card_value', 0, () => document.querySelector('div.content p.font-weight-600')],
+    ['novelty', 0, () => document.querySelector('p.guide-WhitOut-Novelty')],
+  ];
+  if (generic) {
+    // Generic bold text is ambiguous: only accept it once the document had time to settle
+    strategies.push(['bold_text', 1500, () => document.querySelector('p.font-weight-600, strong, b')]);
+  }
+  const started = performance.now();
+  let observer = null;
+  let timer = null;
+  let poll = null;
+  const finish = (res) => {
+    if (observer) observer.disconnect();
+    clearTimeout(timer);
+    clearInterval(poll);
+    resolve(res);
+  };
+  const check = () => {
+    const elapsed = performance.now() - started;
+    for (const [name, minDelay, find] of strategies) {
+      if (elapsed < minDelay) continue;
+      try {
+        const el = find();
+        if (visible(el)) {
+          const text = (el.innerText || '').trim();
+          if (text) { finish({ text, strategy: name }); return true; }
+        }
+      } catch (e) {}
+    }
+    return false;
+  };
+  if (check()) return;
+  observer = new MutationObserver(() => { check(); });
+  observer.observe(document.documentElement || document,
+    { childList: true, subtree: true, characterData: true, attributes: true });
+  // Visibility can change without mutations (CSS transitions); re-check at a low rate
+  poll = setInterval(check, 250);
+  timer = setTimeout(() => finish({ text: '', strategy: '' }), timeoutMs);
+})
+"""
+
+# DEBUG_SCRAPER capture: per-document ring buffers of console messages and fetch/XHR
+# calls, filled in the page (no protocol event or Python callback per request) and
+# read once, only when a failure is dumped. __RING_SIZE__ is replaced on install.
+_DEBUG_RING_JS = """
+(() => {
+  if (window.__interDebug) return;
+  const size = __RING_SIZE__;
+  const ring = () => ({ items: new Array(size), next: 0, count: 0 });
+  const push = (r, ev) => {
+    ev.t = Date.now();
+    r.items[r.next] = ev;
+    r.next = (r.next + 1) % size;
+    if (r.count < size) r.count++;
+  };
+  const read = (r, since) => {
+    const out = [];
+    const start = (r.next - r.count + size) % size;
+    for (let i = 0; i < r.count; i++) {
+      const ev = r.items[(start + i) % size];
+      if (ev.t >= since) out.push(ev);
+    }
+    return out;
+  };
+  const clip = (v, n) => String(v).slice(0, n);
+  const text = (args) => {
+    try {
+      return clip(Array.from(args).map((a) => typeof a === 'string' ? a : JSON.stringify(a)).join(' '), 500);
+    } catch (e) {
+      return clip(args[0], 500);
+    }
+  };
+  const con = ring();
+  const net = ring();
+  for (const level of ['log', 'info', 'warn', 'error']) {
+    const orig = console[level];
+    console[level] = function () {
+      push(con, { type: level, text: text(arguments) });
+      return orig.apply(this, arguments);
+    };
+  }
+  window.addEventListener('error', (e) => push(con, { type: 'pageerror', text: clip(e.message, 500) }));
+  window.addEventListener('unhandledrejection', (e) => push(con, { type: 'unhandledrejection', text: clip(e.reason, 500) }));
+  const origFetch = window.fetch;
+  if (origFetch) {
+    window.fetch = function (input) {
+      const started = Date.now();
+      const url = clip((input && input.url) || input, 300);
+      return origFetch.apply(this, arguments).then(
+        (r) => { push(net, { rtype: 'fetch', url, status: r.status, ms: Date.now() - started }); return r; },
+        (err) => { push(net, { rtype: 'fetch', url, status: null, error: clip(err, 200), ms: Date.now() - started }); throw err; },
+      );
+    };
+  }
+  const open = XMLHttpRequest.prototype.open;
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.open = function (method, url) {
+    this.__interDebugUrl = clip(url, 300);
+    return open.apply(this, arguments);
+  };
+  XMLHttpRequest.prototype.send = function () {
+    const url = this.__interDebugUrl;
+    const started = Date.now();
+    this.addEventListener('loadend', () => push(net, { rtype: 'xhr', url, status: this.status || null, ms: Date.now() - started }));
+    return send.apply(this, arguments);
+  };
+  Object.defineProperty(window, '__interDebug', {
+    value: { read: (since) => ({ console: read(con, since || 0), network: read(net, since || 0) }) },
+    enumerable: false,
+  });
+})();
+"""
+
+
+class BrowserCrashedError(RuntimeError):
+    """Chromium kept disconnecting and the relaunch budget is exhausted."""
+
 
 class AsyncInterScraper:
     """Async Playwright scraper for Interrapidísimo with concurrency control.
@@ -13,14 +228,55 @@ class AsyncInterScraper:
     - Strictly reads the status from the detail card:
       div.content p.title-current-state + p.font-weight-600
     - Follows the new tab created after entering the tracking number.
-    - Exposes get_status_many to process multiple guides concurrently.
+    - Exposes get_status_many to process multiple guides concurrently, and
+      iter_status_many to stream results as each guide completes.
+    - Reuses warm contexts/pages from a bounded pool (size = max_concurrency).
+    - capture_network resolves a guide from the tracking XHR/fetch response as
+      soon as it lands, racing the DOM extraction cascade.
+    - adaptive=True lets an AIMD controller move concurrency (and the RPS budget)
+      between min_concurrency and max_concurrency based on latency and failures.
+    - session_guides=N keeps a page on the tracking view and re-fills the input
+      for up to N guides, falling back to a full navigation on any anomaly.
+    - pipeline=True pre-navigates a standby page per worker while the current
+      extraction is in flight, so the critical path is type -> search -> extract.
+    - get_status_result / iter_status_results return a StatusResult (strategy,
+      attempts, per-stage timings, error class, final URL, payload); the error
+      class decides whether a guide is retried, deferred or skipped.
+    - engine="http" queries the tracking backend directly and only launches
+      Chromium (lazily) for guides the HTTP path cannot resolve.
+    - browser_endpoint (or BROWSER_ENDPOINT) attaches to a resident browser
+      server over CDP instead of launching Chromium for every run.
+    - A crashed/disconnected browser is relaunched once per crash (at most
+      max_relaunches times) and the affected guides are retried on the new one.
+    - rss_limit_mb / max_pages_per_browser enable a watchdog that drains in-flight
+      guides and restarts Chromium before it grows too large.
+    - Each guide has a GuideBudget (guide_deadline_s of active time, retry_budget
+      extra attempts) shared by navigation retries, worker retries and later
+      passes, so the worst case per guide is bounded.
+    - hedge=True starts a second attempt in another context when a guide runs past
+      the running hedge_quantile latency; the first non-empty status wins.
+    - Every attempt's stage timings feed per-run p50/p90/p99 histograms, logged on
+      close() and written to run_summary_path as JSON; attempts slower than
+      slow_guide_s log a per-stage waterfall.
     """
 
     def __init__(self, headless: bool = True, max_concurrency: int = 3, slow_mo: int = 0,
                  retries: int = 2, timeout_ms: int = 30000, block_resources: bool = True,
                  debug: bool = False, proxy_server: str | None = None,
                  proxy_username: str | None = None, proxy_password: str | None = None,
-                 debug_prefix: str = "debug"):
+                 debug_prefix: str = "debug", pool_max_uses: int = 50,
+                 pool_max_age_s: float = 600.0, engine: str = "browser",
+                 api_url: str | None = None, capture_network: bool = True,
+                 rps: float | None = None, burst: int = 1, adaptive: bool = False,
+                 min_concurrency: int = 1, target_latency_s: float | None = None,
+                 state_dir: str | None = None, session_guides: int = 0,
+                 pipeline: bool = False, block_policy: BlockPolicy | None = None,
+                 asset_cache_dir: str | None = None, browser_endpoint: str | None = None,
+                 max_relaunches: int | None = None, rss_limit_mb: int = 0,
+                 max_pages_per_browser: int = 0, watchdog_interval_s: float = 15.0,
+                 guide_deadline_s: float | None = None, retry_budget: int | None = None,
+                 hedge: bool = False, hedge_quantile: float = 0.9,
+                 run_summary_path: str | None = None, slow_guide_s: float | None = None):
         # Public/backwards-compatible attributes
         self.headless = headless
         self.max_concurrency = max(1, int(max_concurrency))
@@ -32,6 +288,19 @@ class AsyncInterScraper:
         self.timeout = int(timeout_ms)
         self._timeout = self.timeout  # maintain compatibility with existing references
         self.block_resources = block_resources
+        self._block_policy = block_policy or BlockPolicy.from_env()
+        self._block_stats = BlockStats()
+        # Opt-in persistent cache for the site's static JS/CSS (shared across contexts and runs)
+        self._asset_cache: StaticAssetCache | None = None
+        asset_cache_dir = asset_cache_dir or os.getenv("ASSET_CACHE_DIR")
+        if asset_cache_dir:
+            blocked_css = self.block_resources and self._block_policy.css
+            self._asset_cache = StaticAssetCache(
+                asset_cache_dir,
+                ttl_s=float(os.getenv("ASSET_CACHE_TTL_S", "86400")),
+                max_bytes=int(float(os.getenv("ASSET_CACHE_MAX_MB", "200")) * 1_048_576),
+                extensions=("js",) if blocked_css else ("js", "css"),
+            )
         self.debug = debug
         self._pw = None
         self.browser = None
@@ -40,20 +309,175 @@ class AsyncInterScraper:
         self._proxy_server = proxy_server
         self._proxy_username = proxy_username
         self._proxy_password = proxy_password
-        # Debug file prefix
+        # Debug file prefix; artifacts are sampled per error class and written off the loop
         self._debug_prefix = debug_prefix or "debug"
+        self._artifacts = DebugArtifactWriter.from_env(os.path.join(os.getcwd(), "logs"), self._debug_prefix)
+        # DEBUG_SCRAPER journals: in-page ring buffer size per document (console and fetch/XHR)
+        self._debug_ring_size = max(10, int(os.getenv("DEBUG_RING_SIZE", "200")))
+        # Warm context pool (created on start, once the browser exists)
+        self._pool_max_uses = pool_max_uses
+        self._pool_max_age_s = pool_max_age_s
+        self._pool: ContextPool | None = None
+        # Engine selection: "browser" (Playwright only) or "http" (backend first, browser fallback)
+        self.engine = (engine or "browser").strip().lower()
+        self._http: InterHttpClient | None = None
+        self._api_url = api_url
+        self._browser_lock = asyncio.Lock()
+        # Per-guide budget shared by navigation retries, worker retries and later passes
+        self._guide_deadline_s = float(guide_deadline_s or os.getenv("GUIDE_DEADLINE_S") or 3 * self.timeout / 1000.0)
+        self._retry_budget = int(retry_budget if retry_budget is not None
+                                 else os.getenv("GUIDE_RETRY_BUDGET", str(self.retries + 2)))
+        self._budgets: dict[str, GuideBudget] = {}
+        self.budget_exhausted = 0
+        self.deferred_retries = 0
+        # Hedging: recent successful attempt latencies drive the hedge threshold
+        self.hedge = hedge
+        self._hedge_quantile = min(0.99, max(0.5, float(hedge_quantile)))
+        self._latencies: deque = deque(maxlen=200)
+        self.attempts_total = 0
+        self.retries_total = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Stage timing histograms for the run summary; waterfall logging for slow attempts
+        self.stage_stats = StageHistograms()
+        self._run_summary_path = run_summary_path
+        self._slow_guide_s = float(slow_guide_s if slow_guide_s is not None else os.getenv("SLOW_GUIDE_S", "0"))
+        # Resident browser server (CDP endpoint); the server owns Chromium, so close() only detaches
+        self._browser_endpoint = browser_endpoint or os.getenv("BROWSER_ENDPOINT") or None
+        self._connect_timeout_s = float(os.getenv("BROWSER_CONNECT_TIMEOUT_S", "10"))
+        self._remote_browser = False
+        # Crash recovery: every (re)launch bumps the generation; a guide that failed on an
+        # older generation is retried instead of being recorded as empty
+        self._browser_generation = 0
+        self._max_relaunches = max(0, int(max_relaunches if max_relaunches is not None
+                                          else os.getenv("BROWSER_MAX_RELAUNCHES", "3")))
+        self.browser_crashes = 0
+        self.browser_relaunches = 0
+        # Memory watchdog: RSS of our process tree (driver + Chromium) and pages per browser
+        self._rss_limit = max(0, int(rss_limit_mb)) * 1_048_576
+        self._max_pages = max(0, int(max_pages_per_browser))
+        self._watchdog_interval_s = max(1.0, float(watchdog_interval_s))
+        self._watchdog_task: asyncio.Task | None = None
+        self._recycle_task: asyncio.Task | None = None
+        self._rss = RssWindow()
+        self.rss_bytes = 0  # latest sample
+        self._pages_this_browser = 0
+        self.browser_recycles = 0
+        # Admission gate closed while the browser is drained for a recycle
+        self._admit = asyncio.Event()
+        self._admit.set()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._in_flight = 0
+        self._recycling = False
+        # Set when a recycle could not bring a browser back within the relaunch budget
+        self._browser_failure: BrowserCrashedError | None = None
+        # Consent/cookie state shared by every new context (and across runs)
+        state_dir = state_dir or os.getenv("SCRAPER_STATE_DIR") or os.path.join(os.getcwd(), "state")
+        self._storage_state_path = os.path.join(state_dir, "inter_storage_state.json")
+        # Whether a guide already waited for the banner (only done while no state is saved)
+        self._consent_waited = False
+        # Session mode: a page stays on the tracking view for up to N guides (0 = off)
+        self.session_guides = max(0, int(session_guides))
+        # Pipeline mode: pre-navigate standby pages while extractions are in flight
+        self.pipeline = pipeline
+        self._standby_tasks: set = set()
+        self._closing = False
+        # Set once the current iteration has no guides left to start (no standby needed)
+        self._source_drained = False
+        self.standby_prepared = 0
+        self.standby_hits = 0
+        # Search flow profile (popup vs in-page iframe), detected once per run
+        self._flow: dict | None = None
+        self._flow_misses = 0
+        # Resolve guides from the tracking backend response (DOM extraction as fallback)
+        self.capture_network = capture_network
+        # Adaptive concurrency: max_concurrency becomes the ceiling, min_concurrency the floor
+        self._controller: AimdController | None = None
+        if adaptive:
+            self._controller = AimdController(
+                floor=min(max(1, int(min_concurrency)), self.max_concurrency),
+                ceiling=self.max_concurrency,
+                target_latency_s=target_latency_s or self.timeout / 2000.0,
+            )
+            self._sem = AdaptiveLimiter(self._controller.concurrency)
+        # Shared rate limiter: every attempt (first pass, retries, second pass) takes a token
+        self._burst = max(1, int(burst))
+        self._limiter: TokenBucket | None = None
+        self._configure_rate(rps)
 
     async def start(self):
-        logging.info("[PW] Starting async_playwright...")
-        self._pw = await async_playwright().start()
+        if self.engine == "http":
+            try:
+                self._http = InterHttpClient(
+                    api_url=self._api_url,
+                    timeout_ms=self.timeout,
+                    max_connections=self.max_concurrency * 2,
+                    proxy_server=self._proxy_server,
+                    proxy_username=self._proxy_username,
+                    proxy_password=self._proxy_password,
+                )
+                await self._http.start()
+                # Chromium is launched on the first guide that needs the fallback
+                return
+            except Exception as e:
+                logging.warning("[HTTP] Engine unavailable (%s); using browser engine", e)
+                self._http = None
+        await self._launch_browser()
+
+    async def _ensure_browser(self):
+        if self.browser is not None:
+            return
+        async with self._browser_lock:
+            if self.browser is None:
+                await self._launch_browser()
+
+    async def _launch_browser(self):
+        if self._pw is None:
+            logging.info("[PW] Starting async_playwright...")
+            self._pw = await async_playwright().start()
+        if self._browser_endpoint:
+            self.browser = await self._connect_browser_server()
+        if self.browser is None:
+            await self._launch_local_browser()
+        self._browser_generation += 1
+        self._pages_this_browser = 0
+        self.browser.on("disconnected", self._on_browser_disconnected)
+        if (self._rss_limit or self._max_pages) and self._watchdog_task is None:
+            self._watchdog_task = asyncio.create_task(self._watchdog())
+        size = self.max_concurrency * (2 if self.pipeline else 1)
+        if self.hedge:
+            # Headroom so hedged attempts never wait for (or steal) a worker's context
+            size += max(1, self.max_concurrency // 2)
+        self._pool = ContextPool(
+            self._new_pooled_context,
+            # One standby page per worker in pipeline mode
+            size=size,
+            max_uses=self._pool_max_uses,
+            max_age_s=self._pool_max_age_s,
+        )
+
+    async def _connect_browser_server(self):
+        """Attach to the resident browser server; None (local launch) if it is not reachable."""
+        deadline = time.monotonic() + self._connect_timeout_s
+        while True:
+            try:
+                browser = await self._pw.chromium.connect_over_cdp(
+                    self._browser_endpoint, timeout=5000, slow_mo=self.slow_mo if self.headless else 0,
+                )
+                self._remote_browser = True
+                logging.info("[PW] Attached to browser server at %s", self._browser_endpoint)
+                return browser
+            except Exception as e:
+                if time.monotonic() >= deadline:
+                    logging.warning("[PW] Browser server %s unavailable (%s); launching locally",
+                                    self._browser_endpoint, e)
+                    return None
+                await asyncio.sleep(1.0)
+
+    async def _launch_local_browser(self):
         logging.info("[PW] Launching Chromium. headless=%s", self.headless)
-        args = [
-            "--disable-blink-features=AutomationControlled",
-            "--disable-dev-shm-usage",
-            "--no-sandbox",
-            "--disable-gpu",
-            "--window-size=1280,800",
-        ]
+        args = list(CHROMIUM_ARGS)
         if not self.headless:
             args.append("--start-maximized")
         launch_kwargs = {
@@ -69,9 +493,194 @@ class AsyncInterScraper:
         self.browser = await self._pw.chromium.launch(**launch_kwargs)
         logging.info("[PW] Chromium launched. slow_mo=%s", self.slow_mo if self.headless else 0)
 
+    def _on_browser_disconnected(self, browser) -> None:
+        if self._closing or browser is not self.browser:
+            return
+        self.browser_crashes += 1
+        logging.error("[PW] Browser disconnected (crash #%d)", self.browser_crashes)
+
+    def _browser_lost(self, generation: int) -> bool:
+        """True if the browser used by an attempt started at ``generation`` is gone."""
+        if generation == 0:
+            return False  # Attempt started before any browser existed (HTTP engine)
+        if self.browser is None:
+            return True  # Relaunch in progress
+        return generation != self._browser_generation or not self.browser.is_connected()
+
+    async def _recover_browser(self, generation: int) -> None:
+        """Relaunch the browser once per crash; concurrent callers wait for the same relaunch."""
+        async with self._browser_lock:
+            if generation != self._browser_generation and self.browser is not None and self.browser.is_connected():
+                return  # Another worker already relaunched it
+            if self.browser_relaunches >= self._max_relaunches:
+                raise BrowserCrashedError(
+                    f"browser crashed {self.browser_crashes} times; relaunch budget ({self._max_relaunches}) exhausted"
+                )
+            self.browser_relaunches += 1
+            logging.warning("[PW] Relaunching browser (%d/%d)", self.browser_relaunches, self._max_relaunches)
+            await self._restart_browser()
+
+    async def _restart_browser(self) -> None:
+        """Replace the browser and its context pool. Caller holds ``_browser_lock``."""
+        for task in list(self._standby_tasks):
+            task.cancel()
+        old_pool, old_browser = self._pool, self.browser
+        # Detach first so the disconnect of the old browser is not counted as a crash
+        self._pool = None
+        self.browser = None
+        with suppress(Exception):
+            if old_pool:
+                await old_pool.close()
+        with suppress(Exception):
+            if old_browser and not self._remote_browser:
+                await old_browser.close()
+        self._remote_browser = False
+        await self._launch_browser()
+
+    def _sample_rss(self) -> int:
+        rss, _count = descendant_rss_bytes()
+        self._rss.add(rss)
+        self.rss_bytes = rss
+        return rss
+
+    def memory_stats(self) -> str:
+        """RSS over time since the last call, plus recycle counters (logged per batch)."""
+        with suppress(Exception):
+            self._sample_rss()
+        return (f"{self._rss.report()} pages_this_browser={self._pages_this_browser} "
+                f"recycles={self.browser_recycles}")
+
+    def run_counters(self) -> dict:
+        """Run-wide counters stored next to the stage histograms in the run summary."""
+        return {
+            "engine": self.engine,
+            "max_concurrency": self.max_concurrency,
+            "attempts_total": self.attempts_total,
+            "retries_total": self.retries_total,
+            "budget_exhausted": self.budget_exhausted,
+            "deferred_retries": self.deferred_retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "standby_hits": self.standby_hits,
+            "browser_crashes": self.browser_crashes,
+            "browser_relaunches": self.browser_relaunches,
+            "browser_recycles": self.browser_recycles,
+            "rss_peak_mb": round(self._rss.peak / 1_048_576, 1),
+        }
+
+    async def _watchdog(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self._watchdog_interval_s)
+            if self.browser is None or self._recycling:
+                continue
+            try:
+                rss = await asyncio.to_thread(self._sample_rss)
+            except Exception as e:
+                logging.debug("[Watchdog] RSS sample failed: %s", e)
+                continue
+            logging.debug("[Watchdog] rss=%.0fMB pages=%d", rss / 1_048_576, self._pages_this_browser)
+            if self._rss_limit and rss >= self._rss_limit:
+                await self._recycle_browser(f"rss {rss / 1_048_576:.0f}MB >= {self._rss_limit // 1_048_576}MB")
+            else:
+                self._maybe_recycle_for_pages()
+
+    def _maybe_recycle_for_pages(self) -> None:
+        if not self._max_pages or self._pages_this_browser < self._max_pages or self._recycling:
+            return
+        if self._recycle_task is None or self._recycle_task.done():
+            self._recycle_task = asyncio.create_task(
+                self._recycle_browser(f"pages {self._pages_this_browser} >= {self._max_pages}")
+            )
+
+    async def _recycle_browser(self, reason: str) -> None:
+        """Drain in-flight guides, restart Chromium, then reopen admission."""
+        if self._recycling or self._closing:
+            return
+        self._recycling = True
+        self._admit.clear()
+        started = time.monotonic()
+        try:
+            logging.warning("[Watchdog] Recycling browser (%s); draining %d in-flight guides", reason, self._in_flight)
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._drained.wait(), timeout=2 * self._timeout / 1000.0)
+            async with self._browser_lock:
+                if self._closing:
+                    return
+                await self._restart_browser()
+            self.browser_recycles += 1
+            logging.info("[Watchdog] Browser recycled in %.1fs (recycles=%d) %s",
+                         time.monotonic() - started, self.browser_recycles, self._rss.report())
+        except Exception as e:
+            logging.error("[Watchdog] Browser recycle failed: %s", e)
+            await self._relaunch_after_failed_recycle()
+        finally:
+            # Never leave the page counter at the cap, or every admitted guide re-triggers a recycle
+            self._pages_this_browser = 0
+            self._recycling = False
+            self._admit.set()
+
+    async def _relaunch_after_failed_recycle(self) -> None:
+        """Relaunch with backoff, drawing on the crash relaunch budget. When the budget runs
+        out, admission raises BrowserCrashedError instead of scheduling more recycles."""
+        while (self.browser is None or self._pool is None) and not self._closing:
+            if self.browser_relaunches >= self._max_relaunches:
+                self._browser_failure = BrowserCrashedError(
+                    f"browser recycle failed; relaunch budget ({self._max_relaunches}) exhausted"
+                )
+                logging.error("[Watchdog] %s", self._browser_failure)
+                return
+            self.browser_relaunches += 1
+            backoff = min(30.0, 2.0 ** (self.browser_relaunches - 1))
+            logging.warning("[Watchdog] Relaunching browser in %.0fs (%d/%d)",
+                            backoff, self.browser_relaunches, self._max_relaunches)
+            await asyncio.sleep(backoff)
+            try:
+                async with self._browser_lock:
+                    await self._restart_browser()
+            except Exception as e:
+                logging.error("[Watchdog] Relaunch failed: %s", e)
+
+    def pool_stats(self) -> str:
+        return self._pool.stats() if self._pool else "pool not started"
+
     async def close(self):
+        self._closing = True
+        for task in (self._watchdog_task, self._recycle_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        for task in list(self._standby_tasks):
+            task.cancel()
+        if self._standby_tasks:
+            await asyncio.gather(*self._standby_tasks, return_exceptions=True)
+        if self.pipeline:
+            logging.info("[PW] Standby pages prepared=%d used=%d", self.standby_prepared, self.standby_hits)
+        if self.block_resources:
+            logging.info("[PW] Resource blocking: %s", self._block_stats.summary())
+        if self._asset_cache is not None:
+            logging.info("[PW] Static %s", self._asset_cache.summary())
+        if self.browser_crashes or self.browser_relaunches:
+            logging.warning("[PW] Browser crashes=%d relaunches=%d", self.browser_crashes, self.browser_relaunches)
+        if self.stage_stats.attempts:
+            logging.info("[PW] %s", self.stage_stats.report())
+            if self._run_summary_path:
+                try:
+                    path = self.stage_stats.write_json(self._run_summary_path, **self.run_counters())
+                    logging.info("[PW] Run summary written: %s", path)
+                except Exception as e:
+                    logging.warning("[PW] Could not write run summary: %s", e)
+        await asyncio.to_thread(self._artifacts.close)
+        if self._artifacts.written or self._artifacts.skipped or self._artifacts.dropped:
+            logging.info("[PW] %s", self._artifacts.summary())
         with suppress(Exception):
-            if self.browser:
+            if self._http:
+                await self._http.close()
+        with suppress(Exception):
+            if self._pool:
+                logging.info("[PW] Context %s", self._pool.stats())
+                await self._pool.close()
+        with suppress(Exception):
+            if self.browser and not self._remote_browser:
                 logging.info("[PW] Closing browser...")
                 await self.browser.close()
         with suppress(Exception):
@@ -79,166 +688,444 @@ class AsyncInterScraper:
                 logging.info("[PW] Stopping async_playwright...")
                 await self._pw.stop()
 
-    async def _maybe_accept_cookies(self, page):
-        """Attempt to accept common cookie banners (main and consent iframes)."""
+    async def _maybe_accept_cookies(self, page, wait_ms: int = 0) -> bool:
+        """Accept common cookie banners (main page or consent iframes).
+
+        With ``wait_ms`` the banner (injected asynchronously after domcontentloaded) is
+        waited for first; otherwise a single combined selector is probed without
+        waiting. Only a visible banner is clicked. Returns True if a banner was accepted.
+        """
+        banner_css = "#onetrust-accept-btn-handler, button[aria-label='Aceptar'], button:has-text('Aceptar')"
+        # Consent frames (OneTrust/SourcePoint)
+        frames_css = "iframe[id^='sp_message_iframe'], iframe[id*='consent'], iframe[id*='onetrust']"
+        if wait_ms:
+            with suppress(Exception):
+                await page.locator(f"{banner_css}, {frames_css}").first.wait_for(state="visible", timeout=wait_ms)
         try:
-            selectors = [
-                "button:has-text('Aceptar')",
-                "button:has-text('Aceptar todas')",
-                "#onetrust-accept-btn-handler",
-                "button[aria-label='Aceptar']",
-            ]
-            for sel in selectors:
-                try:
-                    await page.locator(sel).first.click(timeout=2000)
-                    return
-                except Exception:
-                    pass
-            # Consent frames (OneTrust/SourcePoint)
-            fl = page.frame_locator("iframe[id^='sp_message_iframe'], iframe[id*='consent'], iframe[id*='onetrust']").first
-            try:
+            banner = page.locator(banner_css).first
+            if await banner.is_visible():
+                await banner.click(timeout=2000)
+                return True
+            if await page.locator(frames_css).count():
+                fl = page.frame_locator(frames_css).first
                 await fl.locator("button:has-text('Aceptar'), #onetrust-accept-btn-handler").first.click(timeout=2000)
-            except Exception:
-                pass
+                return True
         except Exception:
             pass
-    async def _extract_status_from_page(self, page) -> str:
-        # Wait basic load
-        with suppress(PlaywrightTimeoutError):
-            logging.debug("[PW] Waiting for DOMContentLoaded (timeout=%sms)", self.timeout)
-            await page.wait_for_load_state("domcontentloaded", timeout=self.timeout)
-        # Anchor to the title and read the following bold text
+        return False
+
+    def _load_consent_state(self) -> dict | None:
+        """Saved consent state, or None when missing or unreadable (treated as no state)."""
+        if not self._storage_state_path or not os.path.isfile(self._storage_state_path):
+            return None
         try:
-            title = page.locator("css=div.content p.title-current-state").first
-            logging.debug("[PW] Waiting title-current-state visible")
-            await title.wait_for(state="visible", timeout=self.timeout)
-            # Prefer CSS sibling combinator first, then XPath fallback
-            value = title.locator("css=~ p.font-weight-600").first
-            if not await value.is_visible(timeout=1000):
-                value = title.locator("xpath=following-sibling::p[contains(@class,'font-weight-600')][1]")
-            logging.debug("[PW] Waiting value (font-weight-600) visible")
-            await value.wait_for(state="visible", timeout=self.timeout)
-            txt = (await value.inner_text()).strip()
-            if txt:
-                logging.debug("[PW] Extracted status via primary locator: %s", txt)
-                return txt
-        except PlaywrightTimeoutError:
-            pass
-        # Alternative anchor: by text content of the title (class may vary)
+            with open(self._storage_state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else None
+        except (OSError, ValueError) as e:
+            logging.warning("[PW] Ignoring unreadable consent state %s: %s", self._storage_state_path, e)
+            return None
+
+    async def _save_consent_state(self, context) -> None:
+        """Persist cookies/localStorage after accepting the banner so new contexts start consented."""
+        if not self._storage_state_path:
+            return
         try:
-            title_by_text = page.locator(
-                "xpath=(//*[self::p or self::h1 or self::h2 or self::div][contains(normalize-space(.), 'Estado actual de tu envío')])[1]"
-            )
-            logging.debug("[PW] Waiting alternative title text visible")
-            await title_by_text.wait_for(state="visible", timeout=min(6000, self.timeout))
-            value = title_by_text.locator("css=~ p.font-weight-600").first
-            if not await value.is_visible(timeout=1000):
-                value = title_by_text.locator("xpath=following::p[contains(@class,'font-weight-600')][1]")
-            logging.debug("[PW] Waiting value (alt) visible")
-            await value.wait_for(state="visible", timeout=min(6000, self.timeout))
-            txt = (await value.inner_text()).strip()
-            if txt:
-                logging.debug("[PW] Extracted status via alt locator: %s", txt)
-                return txt
-        except PlaywrightTimeoutError:
-            pass
-        # Direct CSS fallback within the same content card
-        with suppress(Exception):
-            value2 = page.locator("css=div.content p.font-weight-600").first
-            logging.debug("[PW] Waiting fallback value visible")
-            await value2.wait_for(state="visible", timeout=min(5000, self.timeout))
-            txt2 = (await value2.inner_text()).strip()
-            if txt2:
-                logging.debug("[PW] Extracted status via fallback: %s", txt2)
-                return txt2
-        # Last resort: novelty pill
+            state = await context.storage_state()
+            os.makedirs(os.path.dirname(self._storage_state_path), exist_ok=True)
+            # Per-process temp name: shards may save at the same time
+            tmp = f"{self._storage_state_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self._storage_state_path)
+            logging.info("[PW] Consent state saved: %s", self._storage_state_path)
+        except Exception as e:
+            logging.debug("[PW] Could not save consent state: %s", e)
+
+    async def _extract_in_document(self, frame, timeout_ms: int, generic: bool = False) -> Tuple[str, str]:
+        """Run the injected extractor in a page/frame. Returns (status, strategy) in one round trip.
+
+        Retries once if the document navigates while the extractor is waiting.
+        """
+        for _ in range(2):
+            try:
+                res = await frame.evaluate(_STATUS_EXTRACTOR_JS, [int(timeout_ms), bool(generic)])
+                return (res.get("text") or "").strip(), res.get("strategy") or ""
+            except Exception as e:
+                if "context was destroyed" not in str(e) and "navigat" not in str(e):
+                    raise
+                logging.debug("[PW] Extractor restarted after navigation: %s", e)
+        return "", ""
+
+    async def _extract_status_from_dom(self, target, tracking_number: str,
+                                       clock: StageClock | None = None) -> Tuple[str, str, Any]:
+        """Race the in-page extractor on the target document and inside the tracking iframe.
+
+        Returns (status, strategy, iframe frame or None). With a ``clock``, the moment the
+        tracking iframe attaches is marked as ``extraction.iframe_mount``.
+
+        While ``target`` is still the landing page (inline flow, session reuse) its loose
+        page strategies can match stale or unrelated text, so a page result is only used
+        once the iframe path has finished empty. On a popup/same-page tracking view the
+        first non-empty result wins.
+        """
+        iframe = None
+        on_landing = True
         with suppress(Exception):
-            novelty = page.locator("css=p.guide-WhitOut-Novelty").first
-            await novelty.wait_for(state="visible", timeout=min(3000, self.timeout))
-            txt3 = (await novelty.inner_text()).strip()
-            if txt3:
-                return txt3
-        return ""
-
-    async def _extract_status_from_frame(self, frame) -> str:
-        """Try to extract status text from an iframe frame.
-        Attempts similar heuristics as page extraction but scoped to the frame.
-        Prioritizes: title-current-state ~ p.font-weight-600, then p.font-weight-600, then p.guide-WhitOut-Novelty.
+            on_landing = target.url.startswith(LANDING_URL)
+
+        async def _from_page() -> Tuple[str, str]:
+            status, strategy = await self._extract_in_document(target, self.timeout)
+            if status:
+                logging.debug("[PW] [%s] Extracted status via page/%s: %s", tracking_number, strategy, status)
+            return status, f"page/{strategy}"
+
+        async def _from_iframe() -> Tuple[str, str]:
+            nonlocal iframe
+            el = await target.wait_for_selector(_RESULT_IFRAME_CSS, state="attached", timeout=self.timeout)
+            iframe = await el.content_frame()
+            if clock is not None:
+                clock.mark("iframe_mount")
+            if iframe is None:
+                return "", ""
+            status, strategy = await self._extract_in_document(iframe, self.timeout, generic=True)
+            if status:
+                logging.debug("[PW] [%s] Extracted status via iframe/%s: %s", tracking_number, strategy, status)
+            return status, f"iframe/{strategy}"
+
+        page_task = asyncio.create_task(_from_page())
+        iframe_task = asyncio.create_task(_from_iframe())
+        tasks = {page_task, iframe_task}
+        result, strategy = "", ""
+        held = None  # landing-page result waiting for the iframe path to come back empty
+        try:
+            while tasks and not result:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.cancelled() or t.exception() is not None or not t.result()[0]:
+                        continue
+                    if t is page_task and on_landing:
+                        held = t.result()
+                        continue
+                    result, strategy = t.result()
+                    break
+                if not result and held is not None and iframe_task.done():
+                    result, strategy = held
+        finally:
+            for t in tasks:
+                t.cancel()
+            for t in tasks:
+                with suppress(BaseException):
+                    await t
+        return result, strategy, iframe
+
+    async def _race_network_and_dom(self, net_future: asyncio.Future, target, tracking_number: str,
+                                    clock: StageClock | None = None) -> Tuple[str, str, Any, Any]:
+        """Resolve from the tracking backend response as soon as it lands; DOM extraction is the fallback.
+
+        Returns (status, strategy, iframe or None, backend payload or None).
         """
-        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
-        with suppress(PlaywrightTimeoutError):
-            await frame.wait_for_load_state("domcontentloaded", timeout=min(8000, self._timeout))
-        # Primary: same pattern as page
+        dom_task = asyncio.create_task(self._extract_status_from_dom(target, tracking_number, clock))
         try:
-            title = frame.locator("css=div.content p.title-current-state").first
-            await title.wait_for(state="visible", timeout=min(6000, self._timeout))
-            value = title.locator("css=~ p.font-weight-600").first
-            if not await value.is_visible(timeout=1000):
-                value = title.locator("xpath=following-sibling::p[contains(@class,'font-weight-600')][1]")
-            await value.wait_for(state="visible", timeout=min(6000, self._timeout))
-            txt = (await value.inner_text()).strip()
-            if txt:
-                return txt
-        except PlaywrightTimeoutError:
-            pass
-        # Alt by text
+            await asyncio.wait({dom_task, net_future}, return_when=asyncio.FIRST_COMPLETED)
+            if not net_future.done() and not dom_task.result()[0]:
+                # DOM gave up first; give an in-flight response a short grace period
+                with suppress(Exception):
+                    await asyncio.wait_for(asyncio.shield(net_future), timeout=1.0)
+            if net_future.done() and not net_future.cancelled():
+                status, payload = net_future.result()
+                if status:
+                    if clock is not None:
+                        clock.mark("network_response")
+                    logging.debug("[PW] [%s] Status from network response. payload=%s", tracking_number, payload)
+                    return status, "network", None, payload
+            status, strategy, iframe = await dom_task
+            return status, strategy, iframe, None
+        finally:
+            if not dom_task.done():
+                dom_task.cancel()
+                with suppress(BaseException):
+                    await dom_task
+
+    async def _apply_flow_patch(self, slot: PooledContext) -> bool:
+        """Install the window.open override on pages used under the cached popup flow.
+
+        Returns False if the page is patched but the flow is not (yet) popup, i.e. the
+        slot must be replaced so detection sees the site's real behaviour.
+        """
+        popup_flow = self._flow is not None and self._flow["mode"] == "popup" and self._flow["same_page"]
+        if slot.open_patched and not popup_flow:
+            return False
+        if popup_flow and not slot.open_patched:
+            await slot.page.add_init_script(_SAME_PAGE_OPEN_JS)
+            # The current document (e.g. a pre-navigated landing) needs it too
+            with suppress(Exception):
+                await slot.page.evaluate(_SAME_PAGE_OPEN_JS)
+            slot.open_patched = True
+        return True
+
+    def _schedule_standby(self) -> None:
+        if self._closing or self._source_drained:
+            return
+        task = asyncio.create_task(self._prepare_standby())
+        self._standby_tasks.add(task)
+        task.add_done_callback(self._standby_tasks.discard)
+
+    async def _prepare_standby(self) -> None:
+        """Pre-navigate an idle pooled page to the landing page (input visible, consent handled)."""
+        pool = self._pool
+        slot = await pool.try_acquire() if pool is not None else None
+        if slot is None:
+            return
+        ok = False
         try:
-            title_by_text = frame.locator(
-                "xpath=(//*[self::p or self::h1 or self::h2 or self::div][contains(normalize-space(.), 'Estado actual')])[1]"
-            )
-            await title_by_text.wait_for(state="visible", timeout=min(6000, self._timeout))
-            value = title_by_text.locator("css=~ p.font-weight-600").first
-            if not await value.is_visible(timeout=1000):
-                value = title_by_text.locator("xpath=following::p[contains(@class,'font-weight-600')][1]")
-            await value.wait_for(state="visible", timeout=min(6000, self._timeout))
-            txt = (await value.inner_text()).strip()
-            if txt:
-                return txt
-        except PlaywrightTimeoutError:
-            pass
-        # Generic strong/bold text in the card
+            if slot.landing_ready or slot.session_ready:
+                ok = True
+                return
+            if not await self._apply_flow_patch(slot):
+                return
+            # Standby navigations hit the site too, so they share the guides' rate
+            if self._limiter is not None:
+                await self._limiter.acquire()
+            await self._open_landing(slot, "standby")
+            await slot.page.locator(_INPUT_CSS).first.wait_for(state="visible", timeout=self._timeout)
+            slot.landing_ready = True
+            self.standby_prepared += 1
+            ok = True
+        except Exception as e:
+            logging.debug("[PW] Standby pre-navigation failed: %s", e)
+        finally:
+            await pool.release(slot, healthy=ok, keep_page=True)
+
+    async def _open_landing(self, slot: PooledContext, tracking_number: str,
+                            budget: GuideBudget | None = None, clock: StageClock | None = None) -> None:
+        """Full navigation to the landing page (with retries) plus consent handling.
+
+        With a ``budget``, each navigation retry spends one of the guide's retries and
+        the navigation timeout is capped by the guide's remaining time. With a
+        ``clock``, consent handling is timed as its own stage.
+        """
+        page = slot.page
+        logging.debug("[PW] [%s] Navigating to tracking page", tracking_number)
+        # Robust navigation with small retries to mitigate net::ERR_ABORTED/anti-bot redirects
+        for attempt_nav in range(3):
+            nav_timeout = max(45000, self._timeout)
+            if budget is not None:
+                nav_timeout = budget.remaining_ms(nav_timeout)
+            try:
+                await page.goto(LANDING_URL, timeout=nav_timeout, wait_until="domcontentloaded")
+                break
+            except Exception as nav_err:
+                logging.warning("[PW] [%s] nav attempt %d failed: %s", tracking_number, attempt_nav + 1, nav_err)
+                if attempt_nav < 2 and (budget is None or budget.take_retry()):
+                    await asyncio.sleep(1.5 * (attempt_nav + 1))
+                    continue
+                raise
+        slot.session_guides = 0
         with suppress(Exception):
-            el = frame.locator("css=p.font-weight-600, strong, b").first
-            await el.wait_for(state="visible", timeout=min(5000, self._timeout))
-            txt = (await el.inner_text()).strip()
-            if txt:
-                return txt
-        # Novelty pill
+            logging.debug("[PW] [%s] Landed URL: %s", tracking_number, page.url)
+
+        # Try to accept cookie banners (main or common consent iframes)
+        if clock is not None:
+            clock.enter("consent")
+        # Without saved state the first guide waits once for the banner; seeded contexts only probe
+        wait_ms = 0
+        if not self._consent_waited and self._load_consent_state() is None:
+            self._consent_waited = True
+            wait_ms = _CONSENT_WAIT_MS
         with suppress(Exception):
-            novelty = frame.locator("css=p.guide-WhitOut-Novelty").first
-            await novelty.wait_for(state="visible", timeout=min(3000, self._timeout))
-            txt3 = (await novelty.inner_text()).strip()
-            if txt3:
-                return txt3
-        return ""
+            if await self._maybe_accept_cookies(page, wait_ms):
+                await self._save_consent_state(slot.context)
 
-    async def get_status(self, tracking_number: str) -> str:
-        context = None
-        page = None
+    async def _session_reusable(self, slot: PooledContext) -> bool:
+        """Health check for session mode: the previous guide succeeded, the page has not
+        served session_guides guides yet and the search input is visible right now."""
+        if self.session_guides <= 0 or not slot.session_ready or slot.session_guides >= self.session_guides:
+            return False
+        try:
+            return await slot.page.locator(_INPUT_CSS).first.is_visible()
+        except Exception:
+            return False
+
+    async def _trigger_search(self, context, page, loc, tracking_number: str):
+        """Submit the search. Returns (popup page or None, whether a cached flow profile was used).
+
+        The first guide of a run detects whether the site opens the tracking view in a
+        popup (Enter + expect_page) or injects an iframe in-page (Enter or button click)
+        and caches that profile. In popup mode pages get a window.open override so the
+        tracking view loads in the same page; if the site opens the popup some other way
+        the override is dropped and later guides wait for the real popup. In inline mode
+        no popup wait is paid.
+        """
+        buttons_sel = "#BtnGuide:visible, #BtnR:visible, #BtnMovilGuide:visible, #BtnRMovil:visible, #buscarGuia:visible, button.buscarGuia:visible"
+        flow = self._flow
+        if flow is not None and flow["mode"] == "popup" and flow["same_page"]:
+            # window.open is intercepted: the tracking view replaces the landing page.
+            # A popup opened some other way (target=_blank, form) still shows up as a page.
+            opened: list = []
+            on_page = opened.append
+            context.on("page", on_page)
+            try:
+                async with page.expect_navigation(wait_until="domcontentloaded", timeout=_SAME_PAGE_NAV_MS):
+                    await loc.press("Enter")
+                return None, True
+            except PlaywrightTimeoutError:
+                if opened:
+                    logging.warning("[PW] [%s] window.open override missed; using real popups from now on",
+                                    tracking_number)
+                    flow["same_page"] = False
+                    popup = opened[0]
+                    with suppress(Exception):
+                        await popup.bring_to_front()
+                    return popup, True
+                logging.warning("[PW] [%s] Cached popup flow did not navigate; re-detecting", tracking_number)
+                self._reset_flow()
+                return None, False
+            finally:
+                context.remove_listener("page", on_page)
+        if flow is not None and flow["mode"] == "popup":
+            try:
+                async with context.expect_page(timeout=self.timeout) as new_page_info:
+                    await loc.press("Enter")
+                popup = await new_page_info.value
+                with suppress(Exception):
+                    await popup.bring_to_front()
+                return popup, True
+            except PlaywrightTimeoutError:
+                logging.warning("[PW] [%s] Cached popup flow opened no popup; re-detecting", tracking_number)
+                self._reset_flow()
+                return None, False
+        if flow is not None:
+            if flow["trigger"] == "button":
+                try:
+                    await page.locator(buttons_sel).first.click(timeout=3000)
+                except Exception:
+                    await loc.press("Enter")
+            else:
+                await loc.press("Enter")
+            return None, True
+
+        # Detection: press Enter and also try clicking known buttons (site updated behavior)
         popup = None
+        trigger = "enter"
         try:
-            # New context per guide
-            ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                  "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
-            extra_headers = {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "es-CO,es;q=0.9,en;q=0.8",
-                "Upgrade-Insecure-Requests": "1",
-                "sec-ch-ua": '"Google Chrome";v="122", "Chromium";v="122", "Not(A:Brand";v="24"',
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": '"Windows"',
-            }
-            ctx_opts = {
-                "user_agent": ua,
-                "locale": "es-CO",
-                "timezone_id": "America/Bogota",
-                "viewport": {"width": 1280, "height": 800} if self.headless else None,
-                "java_script_enabled": True,
-                "bypass_csp": True,
-                "extra_http_headers": extra_headers,
-            }
-            context = await self.browser.new_context(**ctx_opts)
+            logging.debug("[PW] [%s] Expecting popup on Enter", tracking_number)
+            async with context.expect_page(timeout=2000) as new_page_info:
+                await loc.press("Enter")
+            popup = await new_page_info.value
+            with suppress(Exception):
+                await popup.bring_to_front()
+            logging.debug("[PW] [%s] Popup opened (Enter)", tracking_number)
+        except PlaywrightTimeoutError:
+            popup = None
+        # If no popup, try clicking visible buttons by id/class used on site
+        if popup is None:
+            btn = page.locator(buttons_sel).first
+            with suppress(Exception):
+                await btn.wait_for(state="visible", timeout=3000)
+                await btn.scroll_into_view_if_needed()
+                await btn.click()
+                trigger = "button"
+        self._flow = {"mode": "popup" if popup is not None else "inline", "trigger": trigger,
+                      "same_page": popup is not None}
+        logging.info("[PW] Flow profile detected: %s", self._flow)
+        return popup, False
+
+    def _reset_flow(self) -> None:
+        self._flow = None
+        self._flow_misses = 0
+
+    def _record_flow_result(self, ok: bool, flow_cached: bool) -> None:
+        """Re-detect the flow after consecutive empty results under the cached profile."""
+        if not flow_cached:
+            return
+        if ok:
+            self._flow_misses = 0
+            return
+        self._flow_misses += 1
+        if self._flow_misses >= 3:
+            logging.warning("[PW] %d empty results with flow %s; re-detecting", self._flow_misses, self._flow)
+            self._reset_flow()
+
+    def _make_response_listener(self, tracking_number: str):
+        """Build a context 'response' listener that resolves a future with (status, payload)
+        when the tracking backend answers. Only matching XHR/fetch responses are decoded, and
+        only those whose URL, post data or payload carry ``tracking_number`` are accepted (a
+        late response for the previous guide must not resolve this one); the pending decode
+        tasks are returned so the caller can cancel them."""
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        decode_tasks: set = set()
+
+        def _decode_done(task: asyncio.Task) -> None:
+            decode_tasks.discard(task)
+            if not task.cancelled():
+                task.exception()
+
+        async def _decode(resp, mentioned: bool):
+            try:
+                payload = await resp.json()
+            except Exception:
+                return
+            if not mentioned and tracking_number not in json.dumps(payload, ensure_ascii=False):
+                logging.debug("[PW] [%s] Ignoring tracking response for another guide: %s", tracking_number, resp.url)
+                return
+            status = extract_status_from_payload(payload, tracking_number)
+            if status and not fut.done():
+                fut.set_result((status, payload))
+
+        def _on_response(resp):
+            if fut.done():
+                return
+            try:
+                if resp.request.resource_type not in {"xhr", "fetch"}:
+                    return
+                if not TRACKING_RESPONSE_RE.search(resp.url):
+                    return
+                mentioned = tracking_number in resp.url or tracking_number in (resp.request.post_data or "")
+            except Exception:
+                return
+            logging.debug("[PW] [%s] Tracking response: %s %s", tracking_number, resp.status, resp.url)
+            task = asyncio.create_task(_decode(resp, mentioned))
+            decode_tasks.add(task)
+            task.add_done_callback(_decode_done)
 
+        return fut, _on_response, decode_tasks
+
+    async def _new_pooled_context(self) -> PooledContext:
+        """Create a context with stealth/debug/blocking hooks installed once, plus its page."""
+        ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+        extra_headers = {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+            "Accept-Language": "es-CO,es;q=0.9,en;q=0.8",
+            "Upgrade-Insecure-Requests": "1",
+            "sec-ch-ua": '"Google Chrome";v="122", "Chromium";v="122", "Not(A:Brand";v="24"',
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"Windows"',
+        }
+        ctx_opts = {
+            "user_agent": ua,
+            "locale": "es-CO",
+            "timezone_id": "America/Bogota",
+            "viewport": {"width": 1280, "height": 800} if self.headless else None,
+            "java_script_enabled": True,
+            "bypass_csp": True,
+            "extra_http_headers": extra_headers,
+        }
+        if self._remote_browser and self._proxy_server:
+            # The server is launched without a proxy; apply it per context instead
+            proxy: dict = {"server": self._proxy_server}
+            if self._proxy_username:
+                proxy.update({"username": self._proxy_username, "password": self._proxy_password or ""})
+            ctx_opts["proxy"] = proxy
+        state = self._load_consent_state()
+        if state is not None:
+            # Seed from the saved consent state so the banner is not shown again
+            ctx_opts["storage_state"] = state
+        logging.debug("[PW] Creating pooled context")
+        context = await self.browser.new_context(**ctx_opts)
+        try:
             # Stealth init scripts
             with suppress(Exception):
                 await context.add_init_script(
@@ -262,276 +1149,579 @@ navigator.permissions.query = (parameters) => (
                     """
                 )
 
-            # Debug hooks: capture console and network events when enabled
-            console_events: list[dict] = []
-            network_events: list[dict] = []
+            # Debug capture lives in the page (bounded ring buffers, read only on failure)
             if self.debug:
-                try:
-                    from datetime import datetime
-                    def _ts():
-                        return datetime.utcnow().isoformat() + "Z"
-
-                    def _on_console(msg):
-                        try:
-                            console_events.append({
-                                "t": _ts(),
-                                "type": msg.type,
-                                "text": msg.text,
-                                "page": getattr(msg.page, 'url', lambda: None)() if getattr(msg, 'page', None) else None,
-                            })
-                        except Exception:
-                            pass
-
-                    async def _on_request_finished(req):
-                        try:
-                            rtype = req.resource_type
-                            if rtype in {"xhr", "fetch"}:
-                                status = None
-                                with suppress(Exception):
-                                    resp = await req.response()
-                                    status = resp.status if resp else None
-                                network_events.append({
-                                    "t": _ts(),
-                                    "url": req.url,
-                                    "status": status,
-                                    "rtype": rtype,
-                                })
-                        except Exception:
-                            pass
-
-                    context.on("console", _on_console)
-                    context.on("requestfinished", lambda req: asyncio.create_task(_on_request_finished(req)))
-                except Exception:
-                    pass
+                await context.add_init_script(_DEBUG_RING_JS.replace("__RING_SIZE__", str(self._debug_ring_size)))
 
-            # Block heavy resources to speed up (keep CSS/JS/XHR)
-            if self.block_resources:
-                async def _route_handler(route):
-                    try:
-                        if route.request.resource_type in {"image", "media", "font"}:
-                            await route.abort()
-                        else:
-                            await route.continue_()
-                    except Exception:
-                        with suppress(Exception):
-                            await route.continue_()
-                logging.debug("[PW] Installing route handler (resource blocking)")
-                await context.route("**/*", _route_handler)
-
-            logging.info("[PW] [%-14s] New page", tracking_number)
             page = await context.new_page()
-            logging.debug("[PW] [%s] Navigating to tracking page", tracking_number)
-            url = "https://interrapidisimo.com/sigue-tu-envio/"
-            # Robust navigation with small retries to mitigate net::ERR_ABORTED/anti-bot redirects
-            nav_ok = False
-            for attempt_nav in range(3):
-                try:
-                    await page.goto(url, timeout=max(45000, self._timeout), wait_until="domcontentloaded")
-                    nav_ok = True
-                    break
-                except Exception as nav_err:
-                    logging.warning("[PW] [%s] nav attempt %d failed: %s", tracking_number, attempt_nav + 1, nav_err)
-                    if attempt_nav < 2:
-                        await asyncio.sleep(1.5 * (attempt_nav + 1))
-                        continue
-                    else:
-                        raise
-            if not nav_ok:
-                raise RuntimeError("navigation_failed")
-            with suppress(Exception):
-                logging.debug("[PW] [%s] Landed URL: %s", tracking_number, page.url)
+            slot = PooledContext(context, page)
 
-            # Try to accept cookie banners (main or common consent iframes)
+            # Block heavy resources/third-party hosts with URL-pattern routes, so only the
+            # blocked requests (not every HTML/JS/XHR) cross into Python
+            if self.block_resources:
+                await install_blocking(context, self._block_policy, self._block_stats)
+            # Registered last so it is consulted first; non-cacheable requests fall back
+            if self._asset_cache is not None:
+                await self._asset_cache.install(context)
+            return slot
+        except BaseException:
             with suppress(Exception):
-                await self._maybe_accept_cookies(page)
+                await context.close()
+            raise
+
+    async def get_status(self, tracking_number: str) -> str:
+        return (await self.get_status_result(tracking_number)).status
+
+    async def get_status_result(self, tracking_number: str) -> StatusResult:
+        """Single attempt for one guide, with strategy, per-stage timings and error class."""
+        started = time.monotonic()
+        http_s = None
+        if self._http is not None:
+            try:
+                status, payload = await self._http.fetch(tracking_number)
+                http_s = time.monotonic() - started
+                if status:
+                    logging.info("[HTTP] [%-14s] Status: %s", tracking_number, status)
+                    await self._observe("ok", time.monotonic() - started)
+                    return StatusResult(tracking_number, status=status, strategy="http",
+                                        timings={"http": http_s}, payload=payload)
+                logging.info("[HTTP] [%-14s] No status in payload; falling back to browser", tracking_number)
+            except Exception as e:
+                http_s = time.monotonic() - started
+                logging.warning("[HTTP] [%-14s] Request failed (%s); falling back to browser", tracking_number, e)
+            try:
+                await self._ensure_browser()
+            except Exception as e:
+                logging.error("[PW] Fallback browser launch failed: %s", e)
+                await self._observe("error", time.monotonic() - started)
+                return StatusResult(tracking_number, error_class=errors.ERROR, timings={"http": http_s})
+        await self._wait_admission()
+        self._in_flight += 1
+        self._drained.clear()
+        self._pages_this_browser += 1
+        try:
+            result = await self._get_status_browser(tracking_number)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._drained.set()
+        if http_s is not None:
+            result.timings["http"] = http_s
+        if result.error_class != errors.CRASH:
+            await self._observe(result.outcome, time.monotonic() - started)
+        return result
+
+    async def _wait_admission(self) -> None:
+        """Hold a browser guide back while the watchdog drains the browser for a recycle."""
+        while True:
+            await self._admit.wait()
+            if self._browser_failure is not None:
+                raise self._browser_failure
+            if self._closing or not self._max_pages or self._pages_this_browser < self._max_pages:
+                return
+            self._maybe_recycle_for_pages()
+            await asyncio.sleep(0)  # let the recycle close admission
+
+    async def _get_status_browser(self, tracking_number: str) -> StatusResult:
+        """Browser path. The result's error_class tells why a guide came back empty."""
+        result = StatusResult(tracking_number)
+        clock = StageClock(result.timings, "context")
+        guide_started_ms = int(time.time() * 1000)  # page clock: scopes the debug journals to this guide
+        _enter = clock.enter
+
+        generation = self._browser_generation
+        target = None
+        iframe = None
+        pool = None
+        slot = None
+        page = None
+        popup = None
+        flow_cached = False
+        healthy = False
+        net_future = None
+        on_response = None
+        decode_tasks: set = set()
+        try:
+            # Slots go back to the pool they came from (the pool is replaced on relaunch)
+            pool = self._pool
+            slot = await pool.acquire()
+            if not await self._apply_flow_patch(slot):
+                # Detection needs a page without the window.open override
+                await pool.release(slot, healthy=False)
+                slot = None
+                slot = await pool.acquire()
+                await self._apply_flow_patch(slot)
+            context = slot.context
+            page = slot.page
+
+            logging.info("[PW] [%-14s] Pooled page (uses=%d)", tracking_number, slot.uses)
+            _enter("navigation")
+            if await self._session_reusable(slot):
+                logging.debug("[PW] [%s] Reusing tracking view (session guide %d)", tracking_number, slot.session_guides + 1)
+                with suppress(Exception):
+                    await page.evaluate(_CLEAR_RESULT_JS)
+            elif slot.landing_ready:
+                logging.debug("[PW] [%s] Using pre-navigated standby page", tracking_number)
+                self.standby_hits += 1
+                slot.session_guides = 0
+            else:
+                await self._open_landing(slot, tracking_number, self._budgets.get(tracking_number), clock)
+            slot.landing_ready = False
+            slot.session_guides += 1
+            slot.session_ready = False
+            _enter("input")
 
             # Find the visible input (desktop/mobile)
-            input_css = "#inputGuide:visible, #inputGuideMovil:visible, input.buscarGuiaInput:visible"
-            loc = page.locator(input_css).first
+            loc = page.locator(_INPUT_CSS).first
             logging.debug("[PW] [%s] Waiting for input visible", tracking_number)
             await loc.wait_for(state="visible", timeout=self._timeout)
+            _enter("fill")
             await loc.scroll_into_view_if_needed()
             with suppress(Exception):
                 await loc.fill("")
             await loc.fill(tracking_number)
             logging.debug("[PW] [%s] Tracking typed", tracking_number)
 
-            # Trigger search: press Enter and also try clicking known buttons (site updated behavior)
-            popup = None
-            triggered = False
-            try:
-                logging.debug("[PW] [%s] Expecting popup on Enter", tracking_number)
-                async with context.expect_page(timeout=2000) as new_page_info:
-                    await loc.press("Enter")
-                popup = await new_page_info.value
-                with suppress(Exception):
-                    await popup.bring_to_front()
-                triggered = True
-                logging.debug("[PW] [%s] Popup opened (Enter)", tracking_number)
-            except PlaywrightTimeoutError:
-                popup = None
-            # If no popup, try clicking visible buttons by id/class used on site
-            if not triggered:
-                buttons_sel = "#BtnGuide:visible, #BtnR:visible, #BtnMovilGuide:visible, #BtnRMovil:visible, #buscarGuia:visible, button.buscarGuia:visible"
-                btn = page.locator(buttons_sel).first
-                with suppress(Exception):
-                    await btn.wait_for(state="visible", timeout=3000)
-                    await btn.scroll_into_view_if_needed()
-                    await btn.click()
-                    triggered = True
+            # Subscribe to the tracking backend response before triggering the search
+            if self.capture_network:
+                net_future, on_response, decode_tasks = self._make_response_listener(tracking_number)
+                context.on("response", on_response)
+
+            # Trigger search using the cached flow profile (detected on the first guide)
+            _enter("search")
+            popup, flow_cached = await self._trigger_search(context, page, loc, tracking_number)
+            if self.pipeline:
+                # Overlap the next guide's navigation with this guide's extraction
+                self._schedule_standby()
 
             # After triggering, either a popup opens or an iframe is injected in the same page
             target = popup if popup is not None else page
+            _enter("extraction")
 
-            # Preferred wait: iframe LOCATOR with content already mounted, then inner status locator
-            result = ""
-            try:
-                iframe_fl = target.frame_locator(
-                    "iframe.iframe-sigue-tu-envio, iframe[src*='SiguetuEnvio'], iframe[src*='Shipment']"
-                ).first
-                status_inside = iframe_fl.locator(
-                    "css=div.content p.title-current-state ~ p.font-weight-600, "
-                    "p.font-weight-600, p.guide-WhitOut-Novelty"
-                ).first
-                logging.debug("[PW] [%s] Waiting status inside iframe (preferred)", tracking_number)
-                await status_inside.wait_for(state="visible", timeout=self._timeout)
-                txt = (await status_inside.inner_text()).strip()
-                if txt:
-                    result = txt
-            except Exception:
-                result = ""
-
-            # Fallbacks: try classic frame handle extraction or on-page extraction
-            if not result:
-                iframe = None
-                with suppress(Exception):
-                    # First try by class
-                    el = await target.locator("iframe.iframe-sigue-tu-envio").first.element_handle(timeout=4000)
-                    if el:
-                        iframe = await el.content_frame()
-                if iframe is None:
-                    with suppress(Exception):
-                        el = await target.locator("iframe[src*='SiguetuEnvio'], iframe[src*='Shipment']").first.element_handle(timeout=4000)
-                        if el:
-                            iframe = await el.content_frame()
-                if iframe is not None:
-                    with suppress(Exception):
-                        result = await self._extract_status_from_frame(iframe)
-                if not result:
-                    result = await self._extract_status_from_page(target)
-            logging.info("[PW] [%-14s] Status: %s", tracking_number, result or "<empty>")
-            if not result:
-                # Capture page state if extraction yielded empty
-                with suppress(Exception):
-                    await self._dump_debug(target, tracking_number, reason="empty")
-                with suppress(Exception):
-                    if iframe is not None:
-                        # Dump iframe HTML too for diagnosis
-                        from datetime import datetime
-                        import os
-                        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-                        logs_dir = os.path.join(os.getcwd(), "logs")
-                        os.makedirs(logs_dir, exist_ok=True)
-                        base = os.path.join(logs_dir, f"{self._debug_prefix}_{tracking_number}_{ts}_iframe")
-                        html = await iframe.content()
-                        with open(base + ".html", "w", encoding="utf-8") as f:
-                            f.write(html)
-                # Dump console/network journals when debug enabled
-                if self.debug:
-                    with suppress(Exception):
-                        from datetime import datetime
-                        import json, os
-                        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-                        logs_dir = os.path.join(os.getcwd(), "logs")
-                        os.makedirs(logs_dir, exist_ok=True)
-                        base = os.path.join(logs_dir, f"{self._debug_prefix}_{tracking_number}_{ts}")
-                        with open(base + "_console.ndjson", "w", encoding="utf-8") as f:
-                            for ev in console_events:
-                                f.write(json.dumps(ev, ensure_ascii=False) + "\n")
-                        with open(base + "_network.ndjson", "w", encoding="utf-8") as f:
-                            for ev in network_events:
-                                f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+            if net_future is not None:
+                status, strategy, iframe, payload = await self._race_network_and_dom(net_future, target, tracking_number, clock)
+            else:
+                (status, strategy, iframe), payload = await self._extract_status_from_dom(target, tracking_number, clock), None
+            result.status, result.strategy, result.payload = status, strategy, payload
+            logging.info("[PW] [%-14s] Status: %s", tracking_number, status or "<empty>")
+            self._record_flow_result(bool(status), flow_cached)
+            # Only a clean result keeps the page eligible for the next session guide
+            slot.session_ready = bool(status)
+            if not status:
+                result.error_class = await self._classify_empty(target, iframe, popup)
+                # Capture page state (sampled per error class, written off the event loop)
+                await self._dump_debug(target, tracking_number, result.error_class, iframe=iframe,
+                                       since_ms=guide_started_ms)
+            healthy = True
             return result
         except Exception as e:
+            if self._browser_lost(generation):
+                # Not the guide's fault: the caller relaunches the browser and requeues it
+                logging.warning("[PW] [%-14s] Browser lost mid-guide: %s", tracking_number, e)
+                result.error_class = errors.CRASH
+                return result
             logging.error("[PW] Error for %s: %s", tracking_number, e)
+            result.error_class = self._classify_error(e, clock.stage)
             # Dump debug artifacts if possible
-            with suppress(Exception):
-                target = popup if popup is not None else (page if page is not None else None)
-                if target is not None:
-                    await self._dump_debug(target, tracking_number, reason="exception")
-            return ""
+            target = popup if popup is not None else page
+            if target is not None:
+                await self._dump_debug(target, tracking_number, result.error_class, iframe=iframe,
+                                       since_ms=guide_started_ms)
+            return result
         finally:
+            _enter("cleanup")
+            with suppress(Exception):
+                frame = iframe or target
+                if frame is not None:
+                    result.final_url = frame.url
+            if on_response is not None:
+                with suppress(Exception):
+                    slot.context.remove_listener("response", on_response)
+            if net_future is not None and not net_future.done():
+                net_future.cancel()
+            for task in list(decode_tasks):
+                task.cancel()
             with suppress(Exception):
                 if popup:
                     await popup.close()
+            if slot is not None:
+                # Healthy contexts go back to the pool; failed ones are discarded
+                with suppress(Exception):
+                    await pool.release(slot, healthy=healthy, keep_page=self.session_guides > 0)
+            _enter("done")
+            if self._slow_guide_s and clock.elapsed() >= self._slow_guide_s:
+                logging.info("[PW] [%-14s] Slow attempt %.1fs (%s):\n%s", tracking_number, clock.elapsed(),
+                             result.error_class or result.strategy, clock.waterfall())
+
+    def set_rps(self, rps: float | None) -> None:
+        """Reconfigure the token bucket mid-iteration (None or <= 0 turns throttling off)."""
+        self._configure_rate(rps)
+
+    def _configure_rate(self, rps: float | None) -> None:
+        # A hard cap: the adaptive controller scales concurrency, never the request rate
+        if not rps or rps <= 0:
+            self._limiter = None
+            return
+        if self._limiter is None:
+            self._limiter = TokenBucket(float(rps), burst=self._burst)
+        else:
+            self._limiter.configure(float(rps))
+
+    async def _observe(self, outcome: str, latency_s: float) -> None:
+        """Feed a guide outcome (ok/empty/timeout/navigation/error) to the AIMD controller."""
+        if self._controller is None:
+            return
+        if self._controller.observe(outcome, latency_s):
+            await self._sem.set_limit(self._controller.concurrency)
+
+    @staticmethod
+    def _classify_error(e: BaseException, stage: str) -> str:
+        if stage == "navigation":
+            return errors.NAVIGATION
+        timed_out = isinstance(e, (PlaywrightTimeoutError, asyncio.TimeoutError)) or "Timeout" in str(e)
+        if stage == "input" and timed_out:
+            return errors.INPUT_MISSING
+        if stage == "extraction" and timed_out:
+            return errors.NO_RESULT_FRAME
+        return errors.TIMEOUT if timed_out else errors.ERROR
+
+    async def _classify_empty(self, target, iframe, popup) -> str:
+        """Why an extraction came back empty: no tracking view, unknown guide, or unreadable view.
+
+        The "not found" wording is only trusted inside the tracking view (iframe, popup or
+        same-page view), and only as a short message of its own (alert, modal or leaf
+        element), never as a phrase somewhere in the body text.
+        """
+        frame = iframe
+        if frame is None:
+            on_landing = True
             with suppress(Exception):
-                if page:
-                    await page.close()
-            with suppress(Exception):
-                if context:
-                    await context.close()
+                on_landing = target.url.startswith(LANDING_URL)
+            if popup is None and on_landing:
+                # Still on the landing page without a tracking iframe: the search never produced a view
+                return errors.NO_RESULT_FRAME
+            frame = target
+        with suppress(Exception):
+            messages = await frame.evaluate(_VIEW_MESSAGES_JS)
+            if any(NOT_FOUND_RE.search(m) for m in messages or ()):
+                return errors.NOT_FOUND
+        return errors.EMPTY
 
-    async def get_status_many(self, tracking_numbers: Iterable[str], rps: float | None = None) -> List[Tuple[str, str]]:
-        results: List[Tuple[str, str]] = []
-
-        async def worker(tn: str):
-            async with self._sem:
-                # Retries with backoff
-                delay = 0.75
-                for attempt in range(self._retries + 1):
-                    logging.info("[PW] [%-14s] Attempt %d", tn, attempt + 1)
-                    status = await self.get_status(tn)
-                    if status:
-                        results.append((tn, status))
-                        logging.info("[PW] [%-14s] Done in %d attempts", tn, attempt + 1)
-                        break
-                    if attempt < self._retries:
-                        logging.debug("[PW] [%-14s] Empty, retrying after %.2fs", tn, delay)
-                        await asyncio.sleep(delay)
-                        delay *= 2
-                else:
-                    # After retries, record empty string to keep row mapping intact
-                    results.append((tn, ""))
-                    logging.info("[PW] [%-14s] Empty after retries", tn)
-        tasks = []
-        # Snapshot first to avoid consuming generators twice
-        tn_list = list(tracking_numbers)
-        if rps and rps > 0:
-            interval = 1.0 / float(rps)
-            start = asyncio.get_event_loop().time()
-            logging.info("[PW] Scheduling %d tasks with RPS=%.2f (interval=%.3fs)", len(tn_list), rps, interval)
-            for i, tn in enumerate(tn_list):
-                # Stagger task starts to respect RPS
-                async def delayed_launch(tn=tn, i=i):
-                    target_time = start + i * interval
-                    now = asyncio.get_event_loop().time()
-                    if target_time > now:
-                        await asyncio.sleep(target_time - now)
-                    await worker(tn)
-                tasks.append(asyncio.create_task(delayed_launch()))
+    def _budget_for(self, tn: str) -> GuideBudget:
+        budget = self._budgets.get(tn)
+        if budget is None:
+            budget = self._budgets[tn] = GuideBudget(self._guide_deadline_s, self._retry_budget)
+        return budget
+
+    def reset_budgets(self) -> None:
+        """Forget per-guide budgets (call between batches)."""
+        self._budgets.clear()
+
+    async def _attempt(self, tn: str, budget: GuideBudget) -> StatusResult:
+        """One attempt while holding a concurrency slot (and a rate token).
+
+        The error class is "budget" when the guide's budget does not allow another
+        attempt. A browser crash requeues the attempt in place.
+        """
+        async with self._sem:
+            while True:
+                # Any attempt after the guide's first one (this pass or an earlier one) is a retry
+                spent = bool(budget.attempts)
+                if spent and not budget.take_retry():
+                    return StatusResult(tn, attempts=budget.attempts, error_class=errors.BUDGET, retryable=False)
+                self.retries_total += spent
+                if self._http is None:
+                    # A recycle/relaunch in progress must not spend the guide's active time
+                    await self._wait_admission()
+                if self._limiter is not None:
+                    await self._limiter.acquire()
+                budget.attempts += 1
+                self.attempts_total += 1
+                logging.info("[PW] [%-14s] Attempt %d", tn, budget.attempts)
+                generation = self._browser_generation
+                started = time.monotonic()
+                call = self._get_status_hedged(tn) if self.hedge else self.get_status_result(tn)
+                try:
+                    with budget.charge():
+                        result = await asyncio.wait_for(call, timeout=max(0.001, budget.remaining()))
+                except asyncio.TimeoutError:
+                    logging.warning("[PW] [%-14s] Guide deadline reached (%s)", tn, budget.summary())
+                    result = StatusResult(tn, error_class=errors.TIMEOUT)
+                    # get_status_result was cancelled before reporting; the slowest attempts must reach AIMD
+                    await self._observe(result.outcome, time.monotonic() - started)
+                result.attempts = budget.attempts
+                self.stage_stats.add(result.timings, time.monotonic() - started, result.error_class)
+                if result.status:
+                    self._latencies.append(time.monotonic() - started)
+                if result.status or not self._browser_lost(generation):
+                    return result
+                # Requeue on the relaunched browser without spending a retry
+                budget.attempts -= 1
+                if spent:
+                    budget.retries_left += 1
+                await self._recover_browser(generation)
+                logging.info("[PW] [%-14s] Requeued after browser relaunch", tn)
+
+    def _hedge_threshold(self) -> float | None:
+        """Running latency quantile of successful attempts; None until 20 samples exist."""
+        if len(self._latencies) < 20:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self._hedge_quantile * len(ordered)))]
+
+    async def _hedge_attempt(self, tn: str) -> StatusResult:
+        if self._limiter is not None:
+            await self._limiter.acquire()
+        return await self.get_status_result(tn)
+
+    async def _get_status_hedged(self, tn: str) -> StatusResult:
+        """get_status_result plus one hedged attempt once the primary runs past the threshold."""
+        primary = asyncio.create_task(self.get_status_result(tn))
+        tasks = {primary}
+        try:
+            threshold = self._hedge_threshold()
+            if threshold is not None:
+                await asyncio.wait(tasks, timeout=threshold)
+            if primary.done() or threshold is None or self._pool is None or not self._pool.has_capacity():
+                return await primary
+            self.hedges += 1
+            logging.info("[PW] [%-14s] Hedging after %.1fs (p%d)", tn, threshold, int(self._hedge_quantile * 100))
+            hedge = asyncio.create_task(self._hedge_attempt(tn))
+            tasks.add(hedge)
+            pending = set(tasks)
+            fallback = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception():
+                        continue
+                    result = task.result()
+                    if result.status:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            result.strategy = f"hedge/{result.strategy}"
+                            logging.info("[PW] [%-14s] Hedge won", tn)
+                        return result
+                    if fallback is None or task is primary:
+                        fallback = result
+            return fallback or StatusResult(tn, error_class=errors.ERROR)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def iter_status_many(self, tracking_numbers: Iterable[str],
+                               rps: float | None = None) -> AsyncIterator[Tuple[str, str]]:
+        """Yield (tracking, status) as each guide completes (completion order, not input order)."""
+        async for result in self.iter_status_results(tracking_numbers, rps=rps):
+            yield result.tracking_number, result.status
+
+    async def iter_status_results(self, tracking_numbers: Iterable[str] | AsyncIterable[str],
+                                  rps: float | None = None) -> AsyncIterator[StatusResult]:
+        """Yield a StatusResult per guide as each one completes (completion order).
+
+        A fixed set of max_concurrency workers pulls from the input iterable, so memory
+        stays bounded by the concurrency regardless of batch size. An async iterable
+        keeps the iteration open until it is exhausted, so a long-lived feed (e.g. a
+        shard's task queue) never drains the workers between its items. Empty attempts are
+        deferred to a retry heap (exponential backoff) consumed by the same workers,
+        so slots are only held during page work. Permanent errors (e.g. not_found)
+        are not retried. Breaking out of the loop cancels the in-flight workers.
+        ``rps`` (re)configures the shared token bucket; None keeps the current rate.
+        """
+        if rps is not None:
+            self._configure_rate(rps)
+        source_done = False
+        self._source_drained = False
+        # Failed attempts wait here (keyed by not-before time) without holding a slot
+        deferred: list = []  # heap of (not_before, seq, tn, attempt, delay)
+        seq = itertools.count()
+        active = 0
+        wake = asyncio.Event()
+        out: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+        done_marker = object()
+        feeder = None
+        if hasattr(tracking_numbers, "__aiter__"):
+            fed: deque = deque()
+            feed_done = False
+
+            async def feed():
+                nonlocal feed_done
+                try:
+                    async for tn in tracking_numbers:
+                        fed.append(tn)
+                        wake.set()
+                except Exception as e:
+                    await out.put(e)
+                finally:
+                    feed_done = True
+                    wake.set()
+
+            feeder = asyncio.create_task(feed())
         else:
-            logging.info("[PW] Launching %d tasks immediately (no RPS throttling)", len(tn_list))
-            tasks = [asyncio.create_task(worker(tn)) for tn in tn_list]
+            source = iter(tracking_numbers)
 
-        await asyncio.gather(*tasks)
-        return results
+        def next_job():
+            nonlocal source_done
+            if deferred and deferred[0][0] <= time.monotonic():
+                return heapq.heappop(deferred)
+            if not source_done:
+                if feeder is not None:
+                    # An empty feed is only done once the async source is exhausted
+                    if fed:
+                        return (0.0, next(seq), fed.popleft(), 0, 0.75)
+                    source_done = feed_done
+                else:
+                    for tn in source:
+                        return (0.0, next(seq), tn, 0, 0.75)
+                    source_done = True
+            self._source_drained = source_done and not deferred
+            return None
+
+        async def worker():
+            nonlocal active
+            try:
+                while True:
+                    job = next_job()
+                    if job is None:
+                        if source_done and not deferred and active == 0:
+                            break
+                        # Sleep until the earliest deferred retry is due or another worker
+                        # defers/finishes something
+                        wake.clear()
+                        timeout = max(0.0, deferred[0][0] - time.monotonic()) if deferred else None
+                        with suppress(asyncio.TimeoutError):
+                            await asyncio.wait_for(wake.wait(), timeout)
+                        continue
+                    _, _, tn, attempt, delay = job
+                    budget = self._budget_for(tn)
+                    active += 1
+                    try:
+                        result = await self._attempt(tn, budget)
+                    finally:
+                        active -= 1
+                        wake.set()
+                    if result.status:
+                        logging.info("[PW] [%-14s] Done in %d attempts", tn, budget.attempts)
+                        self._budgets.pop(tn, None)
+                    elif result.error_class == errors.BUDGET:
+                        self.budget_exhausted += 1
+                        logging.info("[PW] [%-14s] Retry budget exhausted (%s)", tn, budget.summary())
+                    elif result.error_class in PERMANENT_ERRORS:
+                        result.retryable = False
+                        logging.info("[PW] [%-14s] Not retrying (%s)", tn, result.error_class)
+                    elif attempt < self._retries and budget.can_retry():
+                        wait = min(delay, budget.remaining())
+                        logging.debug("[PW] [%-14s] Empty (%s), deferring retry by %.2fs", tn, result.error_class, wait)
+                        heapq.heappush(deferred, (time.monotonic() + wait, next(seq), tn, attempt + 1, delay * 2))
+                        self._source_drained = False
+                        self.deferred_retries += 1
+                        wake.set()
+                        continue
+                    else:
+                        # After retries, record an empty result to keep row mapping intact
+                        result.retryable = budget.can_retry()
+                        logging.info("[PW] [%-14s] Empty after retries (%s, %s)", tn, result.error_class, budget.summary())
+                    await out.put(result)
+            except Exception as e:
+                # Surface unexpected failures to the consumer instead of hanging it
+                await out.put(e)
+                return
+            wake.set()
+            await out.put(done_marker)
 
-    async def _dump_debug(self, page, tracking_number: str, reason: str = ""):
-        """Dump HTML and screenshot to logs/ for troubleshooting."""
+        if self._limiter is not None:
+            logging.info("[PW] Streaming with %d workers, RPS=%.2f burst=%d",
+                         self.max_concurrency, self._limiter.rate, self._limiter.burst)
+        else:
+            logging.info("[PW] Streaming with %d workers (no RPS throttling)", self.max_concurrency)
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        finished = 0
         try:
-            from datetime import datetime
-            import os
-            ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-            logs_dir = os.path.join(os.getcwd(), "logs")
-            os.makedirs(logs_dir, exist_ok=True)
-            base = os.path.join(logs_dir, f"{self._debug_prefix}_{tracking_number}_{ts}_{reason}")
-            # HTML
-            html_path = base + ".html"
-            content = await page.content()
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            # Screenshot
-            png_path = base + ".png"
-            await page.screenshot(path=png_path, full_page=True)
-        except Exception:
-            pass
+            while finished < len(workers):
+                item = await out.get()
+                if item is done_marker:
+                    finished += 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if feeder is not None:
+                workers.append(feeder)
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            logging.info("[PW] Context %s", self.pool_stats())
+            if self.browser_crashes:
+                logging.warning("[PW] Browser crashes=%d relaunches=%d", self.browser_crashes, self.browser_relaunches)
+            if self.browser is not None:
+                logging.info("[Watchdog] %s", self.memory_stats())
+            if self.hedge:
+                rate = self.hedges / self.attempts_total * 100 if self.attempts_total else 0.0
+                logging.info("[PW] Hedged %d/%d attempts (%.1f%%), hedge won %d, threshold=%s",
+                             self.hedges, self.attempts_total, rate, self.hedge_wins,
+                             f"{self._hedge_threshold():.1f}s" if self._hedge_threshold() else "warming up")
+            if self.deferred_retries:
+                logging.info("[PW] Deferred retries: %d", self.deferred_retries)
+            if self.budget_exhausted:
+                logging.info("[PW] Guides skipped with an exhausted budget: %d", self.budget_exhausted)
+            if self._controller is not None:
+                logging.info("[PW] %s", self._controller.stats())
+
+    async def get_status_many(self, tracking_numbers: Iterable[str], rps: float | None = None) -> List[Tuple[str, str]]:
+        return [item async for item in self.iter_status_many(tracking_numbers, rps=rps)]
+
+    async def get_status_results(self, tracking_numbers: Iterable[str], rps: float | None = None) -> List[StatusResult]:
+        return [item async for item in self.iter_status_results(tracking_numbers, rps=rps)]
+
+    async def _dump_debug(self, page, tracking_number: str, error_class: str, iframe=None,
+                          since_ms: int = 0) -> None:
+        """Capture HTML, an element-scoped screenshot and (in debug mode) the console/network
+        journals recorded since ``since_ms`` for troubleshooting. Sampled per error class;
+        files are written by the background DebugArtifactWriter.
+        """
+        artifacts = self._artifacts
+        if not artifacts.allow(error_class):
+            return
+        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        base = f"{self._debug_prefix}_{tracking_number}_{ts}_{error_class or 'error'}"
+        with suppress(Exception):
+            artifacts.submit(base + ".html", await page.content())
+        with suppress(Exception):
+            artifacts.submit(base + ".png", await self._debug_screenshot(page))
+        if iframe is not None:
+            with suppress(Exception):
+                artifacts.submit(base + "_iframe.html", await iframe.content())
+        if self.debug:
+            journals = await self._read_debug_journals({"page": page, "iframe": iframe}, since_ms)
+            for kind, events in journals.items():
+                if events:
+                    artifacts.submit(f"{base}_{kind}.ndjson",
+                                     "".join(json.dumps(ev, ensure_ascii=False) + "\n" for ev in events))
+
+    @staticmethod
+    async def _read_debug_journals(frames: dict, since_ms: int) -> dict:
+        """Read the in-page debug ring buffers of each frame (one evaluate per frame)."""
+        journals: dict = {"console": [], "network": []}
+        for label, frame in frames.items():
+            if frame is None:
+                continue
+            with suppress(Exception):
+                data = await frame.evaluate("(since) => window.__interDebug ? window.__interDebug.read(since) : null",
+                                            since_ms)
+                for kind in journals:
+                    journals[kind].extend(dict(ev, frame=label) for ev in (data or {}).get(kind, ()))
+        for events in journals.values():
+            events.sort(key=lambda ev: ev.get("t", 0))
+        return journals
+
+    async def _debug_screenshot(self, page) -> bytes:
+        """Screenshot of the tracking view (iframe or result card) or the search form; the
+        viewport only when none of them is on the page."""
+        loc = page.locator(f"{_RESULT_IFRAME_CSS}, div.content, {_INPUT_CSS}").first
+        with suppress(Exception):
+            if await loc.count():
+                return await loc.screenshot(timeout=3000)
+        return await page.screenshot(full_page=False, timeout=5000)
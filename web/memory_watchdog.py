@@ -0,0 +1,77 @@
+from __future__ import annotations
+import os
+import time
+from typing import Dict, List, Tuple
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "r", encoding="ascii", errors="replace") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces/parens; fields resume after the last ')'
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append(int(name))
+    return children
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def descendant_rss_bytes(root_pid: int | None = None) -> Tuple[int, int]:
+    """Sum the RSS of every descendant of ``root_pid`` (default: this process).
+
+    For a locally launched browser this is the Playwright driver plus the Chromium
+    browser, GPU, utility and renderer processes. Returns (rss_bytes, process_count);
+    (0, 0) where /proc is unavailable.
+    """
+    if not os.path.isdir("/proc"):
+        return 0, 0
+    root = os.getpid() if root_pid is None else int(root_pid)
+    children = _children_map()
+    total = 0
+    count = 0
+    stack = list(children.get(root, ()))
+    while stack:
+        pid = stack.pop()
+        total += _rss_bytes(pid)
+        count += 1
+        stack.extend(children.get(pid, ()))
+    return total, count
+
+
+class RssWindow:
+    """RSS samples since the last report, for per-batch memory-over-time logging."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.peak = 0
+        self._samples: List[Tuple[float, int]] = []
+
+    def add(self, rss: int) -> None:
+        self._samples.append((time.monotonic() - self.started, rss))
+        self.peak = max(self.peak, rss)
+
+    def report(self) -> str:
+        """Summarize and reset the window (the run-wide peak is kept)."""
+        samples, self._samples = self._samples, []
+        if not samples:
+            return "rss no samples"
+        mb = [r / 1_048_576 for _, r in samples]
+        return (f"rss now={mb[-1]:.0f}MB min={min(mb):.0f}MB max={max(mb):.0f}MB "
+                f"samples={len(mb)} over {samples[-1][0] - samples[0][0]:.0f}s "
+                f"run_peak={self.peak / 1_048_576:.0f}MB")
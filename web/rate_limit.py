@@ -0,0 +1,41 @@
+from __future__ import annotations
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst`` tokens banked.
+
+    Waiters are served in FIFO order. The bucket can be reconfigured while in use
+    (e.g. a second pass with a different RPS) without losing the banked tokens.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+
+    def configure(self, rate: float, burst: int | None = None) -> None:
+        self._refill()
+        self.rate = float(rate)
+        if burst is not None:
+            self.burst = max(1, int(burst))
+            self._tokens = min(self._tokens, float(self.burst))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.acquired += 1
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
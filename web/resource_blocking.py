@@ -0,0 +1,120 @@
+from __future__ import annotations
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Pattern, Tuple, Union
+
+# File extensions per blockable category
+_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav", "m4a", "mov"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "css": ("css",),
+}
+
+# Third-party analytics/ads hosts (subdomains included)
+DEFAULT_THIRD_PARTY_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "analytics.tiktok.com",
+    "bat.bing.com",
+)
+
+# Rough average transfer sizes used to estimate bytes saved (requests are never fetched)
+_EST_BYTES = {"image": 30_000, "media": 500_000, "font": 40_000, "css": 20_000, "third_party": 50_000}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+@dataclass
+class BlockPolicy:
+    """What to block. CSS is opt-in because some layouts hide the input without it."""
+
+    image: bool = True
+    media: bool = True
+    font: bool = True
+    css: bool = False
+    third_party: bool = True
+    domains: Tuple[str, ...] = DEFAULT_THIRD_PARTY_DOMAINS
+    # Extra URL globs to block, e.g. image endpoints served without a file extension
+    extra_globs: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_env(cls) -> "BlockPolicy":
+        extra = tuple(d.strip() for d in os.getenv("BLOCK_DOMAINS", "").split(",") if d.strip())
+        return cls(
+            image=_env_bool("BLOCK_IMAGES", True),
+            media=_env_bool("BLOCK_MEDIA", True),
+            font=_env_bool("BLOCK_FONTS", True),
+            css=_env_bool("BLOCK_CSS", False),
+            third_party=_env_bool("BLOCK_THIRD_PARTY", True),
+            domains=DEFAULT_THIRD_PARTY_DOMAINS + extra,
+            extra_globs=tuple(g.strip() for g in os.getenv("BLOCK_GLOBS", "").split(",") if g.strip()),
+        )
+
+    def route_patterns(self) -> List[Tuple[Union[Pattern[str], str], str]]:
+        """(pattern, category) pairs. Only URLs matching these patterns are intercepted, so
+        every other request is served by the browser without a Python round trip.
+
+        Built-in patterns are compiled regexes: Playwright before 1.52 treats ``?`` in
+        globs as a wildcard, so ``**/*.css?*`` would also match e.g. ``x.json``.
+        Images, media and fonts are matched by file extension: assets served from
+        extensionless URLs are not blocked unless listed in ``extra_globs``.
+        """
+        patterns: List[Tuple[Union[Pattern[str], str], str]] = []
+        for category, exts in _EXTENSIONS.items():
+            if not getattr(self, category):
+                continue
+            alt = "|".join(exts)
+            patterns.append((re.compile(rf"^[a-z]+://[^?#]*\.(?:{alt})(?:[?#].*)?$", re.IGNORECASE), category))
+        if self.third_party and self.domains:
+            alt = "|".join(re.escape(d) for d in self.domains)
+            patterns.append((re.compile(rf"^[a-z]+://(?:[^/?#]+\.)?(?:{alt})(?::\d+)?(?:[/?#]|$)", re.IGNORECASE),
+                             "third_party"))
+        for glob in self.extra_globs:
+            patterns.append((glob, "pattern"))
+        return patterns
+
+
+@dataclass
+class BlockStats:
+    requests: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, category: str) -> None:
+        self.requests[category] = self.requests.get(category, 0) + 1
+
+    def estimated_bytes(self) -> int:
+        return sum(_EST_BYTES.get(c, 0) * n for c, n in self.requests.items())
+
+    def summary(self) -> str:
+        total = sum(self.requests.values())
+        return (f"blocked requests={total} by_type={dict(sorted(self.requests.items()))} "
+                f"est_bytes_saved={self.estimated_bytes() / 1_048_576:.1f}MB")
+
+
+async def install_blocking(context, policy: BlockPolicy, stats: BlockStats) -> int:
+    """Register one abort route per blocked pattern on the context. Returns the route count."""
+    patterns = policy.route_patterns()
+    for pattern, category in patterns:
+        async def _abort(route, category=category):
+            stats.record(category)
+            try:
+                await route.abort("blockedbyclient")
+            except Exception:
+                pass
+        await context.route(pattern, _abort)
+    logging.debug("[PW] Installed %d blocking routes", len(patterns))
+    return len(patterns)
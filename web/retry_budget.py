@@ -0,0 +1,59 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class GuideBudget:
+    """Time and retry allowance for one guide, shared by every retry layer.
+
+    - ``time_left`` is the active time the guide may still use, so a guide retried
+      in a later pass continues from what is left instead of starting a fresh clock.
+    - ``retries_left`` counts extra attempts of any kind: navigation retries,
+      worker retries and second-pass attempts.
+    """
+
+    def __init__(self, total_s: float, retries: int):
+        self.total_s = float(total_s)
+        self.time_left = float(total_s)
+        self.retries_left = max(0, int(retries))
+        self.attempts = 0
+        self._running_since: float | None = None
+
+    def remaining(self) -> float:
+        """Seconds left, including the time elapsed in the current charge() window."""
+        left = self.time_left
+        if self._running_since is not None:
+            left -= time.monotonic() - self._running_since
+        return max(0.0, left)
+
+    def remaining_ms(self, cap_ms: int) -> int:
+        return max(1, min(int(cap_ms), int(self.remaining() * 1000)))
+
+    def exhausted(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def can_retry(self) -> bool:
+        return self.retries_left > 0 and not self.exhausted()
+
+    def take_retry(self) -> bool:
+        """Spend one retry; False (nothing spent) when the budget does not allow it."""
+        if not self.can_retry():
+            return False
+        self.retries_left -= 1
+        return True
+
+    @contextmanager
+    def charge(self) -> Iterator["GuideBudget"]:
+        """Charge the wall time of the enclosed block to the guide."""
+        started = time.monotonic()
+        self._running_since = started
+        try:
+            yield self
+        finally:
+            self._running_since = None
+            self.time_left -= time.monotonic() - started
+
+    def summary(self) -> str:
+        return (f"attempts={self.attempts} retries_left={self.retries_left} "
+                f"used={self.total_s - max(0.0, self.time_left):.0f}s/{self.total_s:.0f}s")
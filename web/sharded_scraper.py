@@ -0,0 +1,291 @@
+from __future__ import annotations
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Tuple
+
+from recreacion_linux.web.stage_timings import StageHistograms
+from recreacion_linux.web.status_result import CRASH, StatusResult
+
+# Tracking numbers handed to a worker process at a time (per unit of its concurrency)
+CHUNK_PER_SLOT = 4
+# Chunks queued to one worker ahead of completion (the next one is ready when a chunk ends)
+PREFETCH_CHUNKS = 2
+
+
+def _shard_main(idx: int, gen: int, scraper_kwargs: Dict[str, Any], task_q, result_q) -> None:
+    """Worker process entry point: own event loop, own AsyncInterScraper/Chromium."""
+    from recreacion_linux.logging_setup import setup_file_logging
+    setup_file_logging()
+    logging.info("[Shard %d] Worker process started", idx)
+    try:
+        asyncio.run(_shard_loop(idx, gen, scraper_kwargs, task_q, result_q))
+    except Exception as e:
+        logging.exception("[Shard %d] Worker crashed: %s", idx, e)
+        raise
+    finally:
+        logging.info("[Shard %d] Worker process finished", idx)
+
+
+async def _shard_loop(idx: int, gen: int, scraper_kwargs: Dict[str, Any], task_q, result_q) -> None:
+    from recreacion_linux.web.inter_scraper_async import AsyncInterScraper
+
+    scraper = AsyncInterScraper(**scraper_kwargs)
+    await scraper.start()
+    # Chunk bookkeeping: which chunk each queued guide came from, and guides left per chunk
+    chunk_of: Dict[str, Deque[int]] = {}
+    left: Dict[int, int] = {}
+    unset = object()
+    current_rps: Any = unset
+
+    def _chunk_done(chunk_id: int) -> None:
+        # Run-wide totals of this shard, summed by the parent for its metrics
+        totals = {"attempts": scraper.attempts_total, "retries": scraper.retries_total,
+                  "rss_bytes": scraper.rss_bytes}
+        result_q.put(("done", idx, gen, chunk_id, totals))
+
+    async def _feed() -> AsyncIterator[str]:
+        # One long-lived feed, so workers never drain at chunk boundaries
+        nonlocal current_rps
+        while True:
+            job = await asyncio.to_thread(task_q.get)
+            if job is None:
+                return
+            if job == "reset_budgets":
+                scraper.reset_budgets()
+                continue
+            chunk_id, rps, tracking_numbers = job
+            if current_rps is unset or rps != current_rps:
+                current_rps = rps
+                scraper.set_rps(rps)
+            if not tracking_numbers:
+                _chunk_done(chunk_id)
+                continue
+            left[chunk_id] = len(tracking_numbers)
+            for tn in tracking_numbers:
+                chunk_of.setdefault(tn, deque()).append(chunk_id)
+                yield tn
+
+    try:
+        async for result in scraper.iter_status_results(_feed()):
+            tn = result.tracking_number
+            owners = chunk_of[tn]
+            chunk_id = owners.popleft()
+            if not owners:
+                del chunk_of[tn]
+            result_q.put(("result", idx, gen, chunk_id, result))
+            left[chunk_id] -= 1
+            if left[chunk_id] == 0:
+                del left[chunk_id]
+                _chunk_done(chunk_id)
+    finally:
+        await scraper.close()
+
+
+class ShardedInterScraper:
+    """Runs N worker processes, each owning an AsyncInterScraper, behind the same
+    start/iter_status_many/get_status_many/close interface.
+
+    Guides are dealt in small chunks to each worker's own queue as it finishes
+    the previous ones, so faster shards take more work and the parent always
+    knows which worker owns a chunk. ``rps`` is the total budget and is split
+    evenly across workers. If a worker dies, the guides of its oldest chunk are
+    yielded as empty "crash" results (so the caller's second pass picks them up),
+    the unreported guides of its other chunks go back to other workers, and it is
+    respawned under a new generation; late messages from the dead generation are
+    ignored. Stage timings of the returned results are aggregated here and
+    written to ``run_summary_path`` on close().
+    """
+
+    def __init__(self, workers: int, scraper_kwargs: Dict[str, Any], progress_every_s: float = 30.0,
+                 max_respawns: int | None = None):
+        self.workers = max(1, int(workers))
+        self._respawns_left = max_respawns if max_respawns is not None else 3 * self.workers
+        self._kwargs = dict(scraper_kwargs)
+        # One summary for the whole run, written by this process (not by every shard)
+        self._run_summary_path = self._kwargs.pop("run_summary_path", None)
+        self.stage_stats = StageHistograms()
+        self._per_worker_slots = max(1, int(self._kwargs.get("max_concurrency", 1)))
+        self._progress_every_s = float(progress_every_s)
+        self._ctx = mp.get_context("spawn")
+        self._result_q = self._ctx.Queue()
+        self._procs: List[Any] = []
+        self._task_qs: List[Any] = []
+        self._gens: List[int] = []
+        self._chunk_seq = 0
+        self._shard_totals: Dict[int, Dict[str, int]] = {}
+        self._retired_totals: Dict[str, int] = {}  # counters of respawned workers
+
+    def _spawn(self, idx: int) -> None:
+        """Start (or replace) worker ``idx`` with a fresh task queue and a new generation."""
+        gen = self._gens[idx] + 1 if idx < len(self._gens) else 0
+        task_q = self._ctx.Queue()
+        p = self._ctx.Process(
+            target=_shard_main,
+            args=(idx, gen, self._kwargs, task_q, self._result_q),
+            name=f"inter-shard-{idx}",
+            daemon=True,
+        )
+        p.start()
+        if idx < len(self._procs):
+            self._procs[idx], self._task_qs[idx], self._gens[idx] = p, task_q, gen
+        else:
+            self._procs.append(p)
+            self._task_qs.append(task_q)
+            self._gens.append(gen)
+
+    async def start(self):
+        logging.info("[Shards] Starting %d worker processes (max_concurrency=%d each)", self.workers, self._per_worker_slots)
+        for i in range(self.workers):
+            self._spawn(i)
+
+    async def close(self):
+        for task_q in self._task_qs:
+            task_q.put(None)
+        for p in self._procs:
+            await asyncio.to_thread(p.join, 60)
+            if p.is_alive():
+                logging.warning("[Shards] %s did not exit; terminating", p.name)
+                p.terminate()
+        self._procs, self._task_qs, self._gens = [], [], []
+        if self.stage_stats.attempts:
+            logging.info("[Shards] %s", self.stage_stats.report())
+            if self._run_summary_path:
+                try:
+                    path = self.stage_stats.write_json(self._run_summary_path, workers=self.workers)
+                    logging.info("[Shards] Run summary written: %s", path)
+                except Exception as e:
+                    logging.warning("[Shards] Could not write run summary: %s", e)
+
+    def _next_result(self):
+        try:
+            return self._result_q.get(timeout=1.0)
+        except queue.Empty:
+            return None
+
+    async def iter_status_many(self, tracking_numbers: Iterable[str],
+                               rps: float | None = None) -> AsyncIterator[Tuple[str, str]]:
+        async for result in self.iter_status_results(tracking_numbers, rps=rps):
+            yield result.tracking_number, result.status
+
+    async def iter_status_results(self, tracking_numbers: Iterable[str],
+                                  rps: float | None = None) -> AsyncIterator[StatusResult]:
+        tn_list = list(tracking_numbers)
+        if not tn_list:
+            return
+        shard_rps = (float(rps) / self.workers) if rps and rps > 0 else None
+        size = self._per_worker_slots * CHUNK_PER_SLOT
+        chunks: Dict[int, List[str]] = {}
+        for i in range(0, len(tn_list), size):
+            self._chunk_seq += 1
+            chunks[self._chunk_seq] = tn_list[i:i + size]
+
+        pending: Deque[int] = deque(chunks)
+        remaining = {cid: set(tns) for cid, tns in chunks.items()}
+        owned: List[Deque[int]] = [deque() for _ in self._procs]  # worker idx -> chunk ids, in order
+        per_shard = [0] * len(self._procs)
+        done = 0
+        started = time.monotonic()
+        last_progress = started
+        logging.info("[Shards] Dispatching %d guides in %d chunks (RPS per shard=%s)",
+                     len(tn_list), len(chunks), f"{shard_rps:.2f}" if shard_rps else "off")
+
+        def dispatch() -> None:
+            for idx, queued in enumerate(owned):
+                while pending and len(queued) < PREFETCH_CHUNKS and self._procs[idx].is_alive():
+                    cid = pending.popleft()
+                    queued.append(cid)
+                    # A re-dealt chunk only carries the guides its dead worker did not report
+                    left = [tn for tn in chunks[cid] if tn in remaining[cid]]
+                    self._task_qs[idx].put((cid, shard_rps, left))
+
+        dispatch()
+        while remaining:
+            msg = await asyncio.to_thread(self._next_result)
+            if msg is not None:
+                kind, idx, gen, cid = msg[0], msg[1], msg[2], msg[3]
+                if gen != self._gens[idx] or cid not in owned[idx]:
+                    pass  # late message from a dead generation or an abandoned iteration
+                elif kind == "result":
+                    result = msg[4]
+                    tn = result.tracking_number
+                    if tn in remaining.get(cid, ()):
+                        remaining[cid].discard(tn)
+                        done += 1
+                        per_shard[idx] += 1
+                        self.stage_stats.add(result.timings, error_class=result.error_class)
+                        yield result
+                elif kind == "done":
+                    self._shard_totals[idx] = msg[4]
+                    owned[idx].remove(cid)
+                    # Anything the worker did not report stays empty for the second pass
+                    for tn in remaining.pop(cid, set()):
+                        done += 1
+                        yield StatusResult(tn, error_class=CRASH)
+
+            # Respawn dead workers: its oldest chunk is lost, the others' unreported guides are re-dealt
+            for idx, p in enumerate(self._procs):
+                if p.is_alive():
+                    continue
+                logging.error("[Shards] %s died (exitcode=%s); respawning", p.name, p.exitcode)
+                for key, value in self._shard_totals.pop(idx, {}).items():
+                    if key != "rss_bytes":
+                        self._retired_totals[key] = self._retired_totals.get(key, 0) + value
+                queued, owned[idx] = owned[idx], deque()
+                if queued:
+                    current = queued.popleft()
+                    for tn in remaining.pop(current, set()):
+                        done += 1
+                        yield StatusResult(tn, error_class=CRASH)
+                    pending.extendleft(reversed(queued))
+                if self._respawns_left <= 0:
+                    raise RuntimeError("shard workers keep dying; giving up")
+                self._respawns_left -= 1
+                self._spawn(idx)
+
+            dispatch()
+            now = time.monotonic()
+            if now - last_progress >= self._progress_every_s:
+                last_progress = now
+                elapsed = max(1e-6, now - started)
+                logging.info("[Shards] progress %d/%d (%.2f guides/s) per_shard=%s",
+                             done, len(tn_list), done / elapsed, per_shard)
+
+        elapsed = max(1e-6, time.monotonic() - started)
+        logging.info("[Shards] completed %d guides in %.1fs (%.2f guides/s) per_shard=%s",
+                     done, elapsed, done / elapsed, per_shard)
+
+    def _total(self, key: str) -> int:
+        return self._retired_totals.get(key, 0) + sum(t.get(key, 0) for t in self._shard_totals.values())
+
+    @property
+    def attempts_total(self) -> int:
+        return self._total("attempts")
+
+    @property
+    def retries_total(self) -> int:
+        return self._total("retries")
+
+    @property
+    def rss_bytes(self) -> int:
+        return self._total("rss_bytes")
+
+    def reset_budgets(self) -> None:
+        """Clear every shard's guide budgets (queued behind its pending chunks).
+
+        Budgets are per shard: a second-pass guide dealt to a different shard starts
+        from a fresh budget there, so with ``workers > 1`` the per-guide bound holds
+        per shard and per batch rather than across the whole batch.
+        """
+        for idx, task_q in enumerate(self._task_qs):
+            if self._procs[idx].is_alive():
+                task_q.put("reset_budgets")
+
+    async def get_status_many(self, tracking_numbers: Iterable[str], rps: float | None = None) -> List[Tuple[str, str]]:
+        return [item async for item in self.iter_status_many(tracking_numbers, rps=rps)]
+
+    async def get_status_results(self, tracking_numbers: Iterable[str], rps: float | None = None) -> List[StatusResult]:
+        return [item async for item in self.iter_status_results(tracking_numbers, rps=rps)]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+# Upper bounds (seconds) of the histogram buckets in the run summary
+BUCKETS_S = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0, math.inf)
+
+
+class StageClock:
+    """Monotonic timer for the sequential stages of one guide attempt.
+
+    ``enter(stage)`` closes the current stage and adds its duration to ``timings``.
+    ``mark(name)`` records a point reached inside the current stage (e.g. the
+    tracking iframe attaching during extraction) as ``<stage>.<name>``, measured
+    from the start of that stage.
+    """
+
+    def __init__(self, timings: Dict[str, float], stage: str):
+        self.timings = timings
+        self.started = time.monotonic()
+        self.stage = stage
+        self._stage_started = self.started
+        # (name, offset from start, duration); marks are indented in the waterfall
+        self.events: List[Tuple[str, float, float]] = []
+
+    def enter(self, stage: str) -> None:
+        now = time.monotonic()
+        duration = now - self._stage_started
+        self.timings[self.stage] = self.timings.get(self.stage, 0.0) + duration
+        self.events.append((self.stage, self._stage_started - self.started, duration))
+        self.stage, self._stage_started = stage, now
+
+    def mark(self, name: str) -> None:
+        now = time.monotonic()
+        key = f"{self.stage}.{name}"
+        self.timings[key] = now - self._stage_started
+        self.events.append((key, self._stage_started - self.started, now - self._stage_started))
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def waterfall(self, width: int = 40) -> str:
+        """One line per stage: offset, duration and a bar on a shared time axis."""
+        total = max(1e-6, self.elapsed())
+        lines = []
+        for name, offset, duration in self.events:
+            start = int(offset / total * width)
+            size = max(1, int(round(duration / total * width)))
+            bar = " " * start + "#" * min(size, width - start)
+            label = ("  " + name.split(".", 1)[1]) if "." in name else name
+            lines.append(f"  +{offset:6.2f}s {duration:6.2f}s {label:<16} |{bar:<{width}}|")
+        return "\n".join(lines)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class StageHistograms:
+    """Per-run latency samples per stage, summarized as p50/p90/p99 and bucket counts."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._samples: Dict[str, List[float]] = {}
+        self.attempts = 0
+        self.error_classes: Dict[str, int] = {}
+
+    def add(self, timings: Dict[str, float], total_s: float | None = None, error_class: str = "") -> None:
+        self.attempts += 1
+        key = error_class or "ok"
+        self.error_classes[key] = self.error_classes.get(key, 0) + 1
+        for stage, seconds in timings.items():
+            self._samples.setdefault(stage, []).append(float(seconds))
+        if total_s is None:
+            # Marks are nested inside a stage and do not add to the total
+            total_s = sum(s for stage, s in timings.items() if "." not in stage)
+        self._samples.setdefault("total", []).append(float(total_s))
+
+    def stages(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            buckets: Dict[str, int] = {}
+            i = 0
+            for bound in BUCKETS_S:
+                n = 0
+                while i < len(ordered) and ordered[i] <= bound:
+                    n += 1
+                    i += 1
+                buckets["+Inf" if math.isinf(bound) else f"{bound:g}"] = n
+            out[stage] = {
+                "count": len(ordered),
+                "mean": round(sum(ordered) / len(ordered), 4),
+                "p50": round(_percentile(ordered, 0.50), 4),
+                "p90": round(_percentile(ordered, 0.90), 4),
+                "p99": round(_percentile(ordered, 0.99), 4),
+                "max": round(ordered[-1], 4),
+                "buckets": buckets,
+            }
+        return out
+
+    def report(self) -> str:
+        """Compact multi-line p50/p90/p99 table for the run log."""
+        rows = sorted(self.stages().items(), key=lambda kv: (kv[0] == "total", -kv[1]["p90"]))
+        lines = [f"stage timings over {self.attempts} attempts (p50/p90/p99/max s):"]
+        for stage, s in rows:
+            lines.append(f"  {stage:<24} n={s['count']:<6} {s['p50']:7.2f} {s['p90']:7.2f} {s['p99']:7.2f} {s['max']:7.2f}")
+        return "\n".join(lines)
+
+    def summary(self, **extra: Any) -> Dict[str, Any]:
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "duration_s": round(time.time() - self.started, 1),
+            "attempts": self.attempts,
+            "error_classes": dict(sorted(self.error_classes.items())),
+            "stages": self.stages(),
+            **extra,
+        }
+
+    def write_json(self, path: str, **extra: Any) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.summary(**extra), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        return path
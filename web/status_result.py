@@ -0,0 +1,58 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+# Error classes (empty string = resolved)
+NAVIGATION = "navigation"            # landing page did not load
+INPUT_MISSING = "input_missing"      # search input never became visible
+NO_RESULT_FRAME = "no_result_frame"  # search triggered but no tracking view/iframe mounted
+EMPTY = "empty"                      # tracking view mounted, no status found in it
+NOT_FOUND = "not_found"              # the site says the guide does not exist
+TIMEOUT = "timeout"
+CRASH = "crash"                      # browser disconnected mid-guide
+BUDGET = "budget"                    # guide deadline/retry budget exhausted
+ERROR = "error"
+
+# Never worth another page load in this run
+PERMANENT_ERRORS = frozenset({NOT_FOUND})
+
+# "Guide not found" message of the tracking view: it must name the guide, so phrases like
+# "Sin información de novedades" on a valid guide do not match
+NOT_FOUND_RE = re.compile(
+    r"^\W*(?:la\s+|el\s+)?(?:gu[ií]a|n[uú]mero\s+de\s+gu[ií]a|env[ií]o)(?:\s+(?:n[oº°.]*\s*)?\d[\w-]*)?\s+"
+    r"(?:no\s+(?:existe|(?:es\s+)?v[aá]lid[ao]|(?:fue\s+)?encontrad[ao]|se\s+(?:encontr[oó]|encuentra))|inv[aá]lid[ao])"
+    r"|^\W*no\s+se\s+encontr(?:[oó]|aron)\s+(?:informaci[oó]n|resultados|registros)\s+(?:para|de|con)\s+"
+    r"(?:la|el|esta|este)\s+(?:gu[ií]a|env[ií]o|n[uú]mero)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class StatusResult:
+    """Outcome of one guide lookup (get_status_result / iter_status_results)."""
+
+    tracking_number: str
+    status: str = ""
+    strategy: str = ""  # http, network, page/<name>, iframe/<name>
+    attempts: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)  # stage -> seconds
+    error_class: str = ""
+    final_url: str = ""
+    payload: Any = None
+    retryable: bool = True  # False when another pass would be wasted
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.status)
+
+    @property
+    def outcome(self) -> str:
+        """Outcome fed to the AIMD controller (ok/empty/timeout/navigation/error/crash)."""
+        if self.status or self.error_class == NOT_FOUND:
+            return "ok"
+        if self.error_class in (INPUT_MISSING, NO_RESULT_FRAME):
+            return "timeout"
+        if self.error_class in (EMPTY, TIMEOUT, NAVIGATION, CRASH):
+            return self.error_class
+        return "error"